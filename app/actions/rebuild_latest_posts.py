@@ -0,0 +1,110 @@
+"""
+Rebuilds the Redis "latest posts" feeds from the database.
+
+    python -m actions.rebuild_latest_posts
+"""
+
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from core.cache import cache_client
+from core.latest_posts import latest_posts
+from core.logger import logger
+from core.models import db_helper
+from crud import posts as posts_crud
+
+# Writes that land while the snapshot is taken are replayed afterwards;
+# the margin covers transactions that started before the snapshot
+CATCH_UP_MARGIN = timedelta(minutes=1)
+CATCH_UP_LIMIT = 10_000
+
+
+async def rebuild_latest_posts() -> bool:
+    """
+    Returns False when another process is already rebuilding.
+    """
+    if not await latest_posts.acquire_rebuild_lock():
+        return False
+    try:
+        async with db_helper.session_factory() as session:
+            started_at = await session.scalar(select(func.localtimestamp()))
+            posts = await posts_crud.get_latest_posts(
+                session=session,
+                limit=latest_posts.size,
+            )
+            posts_by_category = await posts_crud.get_latest_posts_by_category(
+                session=session,
+                limit=latest_posts.size,
+            )
+        await latest_posts.replace(posts, posts_by_category)
+        await catch_up(since=started_at - CATCH_UP_MARGIN)
+    except Exception:
+        logger.exception("Could not rebuild latest posts")
+        raise
+    finally:
+        await latest_posts.release_rebuild_lock()
+    logger.info(
+        "Rebuilt latest posts: %d posts in %d categories",
+        len(posts),
+        len(posts_by_category),
+    )
+    return True
+
+
+async def catch_up(since: datetime) -> None:
+    async with db_helper.session_factory() as session:
+        changed = await posts_crud.get_changed_posts(
+            session=session,
+            after=(since, 0),
+            limit=CATCH_UP_LIMIT,
+        )
+        deleted = await posts_crud.get_deleted_posts(
+            session=session,
+            after=(since, 0),
+            limit=CATCH_UP_LIMIT,
+        )
+    if len(changed) == CATCH_UP_LIMIT or len(deleted) == CATCH_UP_LIMIT:
+        logger.warning("Latest posts catch-up truncated, run the rebuild again")
+    for post in changed:
+        if post.created_at >= since:
+            await latest_posts.add(post)
+        else:
+            await latest_posts.update(post)
+    for _, post_id in deleted:
+        await latest_posts.remove(post_id)
+
+
+async def keep_latest_posts_ready(interval: float) -> None:
+    """
+    Rebuilds the feeds whenever they are missing: at startup, after
+    READY_KEY expired, as soon as a reader found a gap, or once Redis
+    answers again after a write could not be applied to them. Checks at least
+    every `interval` seconds and waits that long after a failed rebuild.
+    """
+    while True:
+        latest_posts.rebuild_needed.clear()
+        try:
+            await latest_posts.drop_if_dirty()
+            if not await latest_posts.is_ready():
+                await rebuild_latest_posts()
+        except Exception:
+            # Logged by rebuild_latest_posts, or Redis is unreachable
+            await asyncio.sleep(interval)
+            continue
+        with suppress(TimeoutError):
+            await asyncio.wait_for(latest_posts.rebuild_needed.wait(), interval)
+
+
+async def main() -> None:
+    try:
+        await rebuild_latest_posts()
+    finally:
+        await cache_client.close()
+        await db_helper.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
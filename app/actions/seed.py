@@ -0,0 +1,269 @@
+"""
+Deterministic synthetic dataset for benchmarking.
+
+    python -m actions.seed --users 1000 --categories 300 --posts 5000000
+
+Users and categories are upserted, posts are streamed with COPY in
+batches generated column by column in a worker thread while the
+previous batch is being written.
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from fastapi_users.password import PasswordHelper
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from core.logger import logger
+from core.models import db_helper, Category, User
+
+CATEGORY_NAME_LENGTH = 15
+TAG_VOCABULARY = 500
+POST_COLUMNS = (
+    "title",
+    "content",
+    "category_id",
+    "tags",
+    "created_at",
+    "updated_at",
+    "user_id",
+)
+
+
+def zipf_cum_weights(size: int, exponent: float) -> list[float]:
+    return list(
+        itertools.accumulate(1 / (rank**exponent) for rank in range(1, size + 1))
+    )
+
+
+def make_words(rng: random.Random, count: int) -> list[str]:
+    syllables = [a + b for a in "bcdfghklmnprstvz" for b in "aeiou"]
+    return ["".join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(count)]
+
+
+def make_corpus(rng: random.Random, words: list[str], size: int) -> str:
+    # Word frequencies in natural text are roughly Zipfian as well
+    weights = zipf_cum_weights(len(words), 1.0)
+    corpus = " ".join(rng.choices(words, cum_weights=weights, k=size // 6))
+    return corpus[:size]
+
+
+def category_names(rng: random.Random, words: list[str], count: int) -> list[str]:
+    names = []
+    for index in range(count):
+        suffix = f"-{index}"
+        word = rng.choice(words)[: CATEGORY_NAME_LENGTH - len(suffix)]
+        names.append(f"{word}{suffix}")
+    return names
+
+
+def clipped_lengths(
+    rng: random.Random,
+    count: int,
+    mu: float,
+    sigma: float,
+    low: int,
+    high: int,
+) -> list[int]:
+    return [
+        min(high, max(low, int(rng.lognormvariate(mu, sigma)))) for _ in range(count)
+    ]
+
+
+def slices(rng: random.Random, corpus: str, lengths: list[int]) -> list[str]:
+    limit = len(corpus)
+    starts = [rng.randrange(limit - length) for length in lengths]
+    return [corpus[start : start + length] for start, length in zip(starts, lengths)]
+
+
+def generate_posts(
+    seed: int,
+    batch: int,
+    count: int,
+    corpus: str,
+    user_ids: list[int],
+    category_ids: list[int],
+    tags: list[str],
+    now: datetime,
+    days: int,
+) -> list[tuple]:
+    # Every batch has its own generator, so the output does not depend
+    # on how batches are scheduled
+    rng = random.Random(f"{seed}:{batch}")
+
+    titles = [
+        title.strip().capitalize() or "Untitled"
+        for title in slices(
+            rng, corpus, clipped_lengths(rng, count, 3.7, 0.35, 10, 100)
+        )
+    ]
+    contents = slices(rng, corpus, clipped_lengths(rng, count, 7.3, 0.8, 0, 20_000))
+    category_column = rng.choices(
+        category_ids,
+        cum_weights=zipf_cum_weights(len(category_ids), 1.1),
+        k=count,
+    )
+    user_column = rng.choices(
+        user_ids,
+        cum_weights=zipf_cum_weights(len(user_ids), 0.8),
+        k=count,
+    )
+    tag_weights = zipf_cum_weights(len(tags), 1.2)
+    tag_column = [
+        sorted(set(rng.choices(tags, cum_weights=tag_weights, k=size))) or None
+        for size in rng.choices(range(6), k=count)
+    ]
+    span = days * 86_400
+    created_column = [
+        now - timedelta(seconds=rng.random() * span) for _ in range(count)
+    ]
+    updated_column = [
+        (
+            created + timedelta(seconds=rng.random() * (now - created).total_seconds())
+            if rng.random() < 0.2
+            else created
+        )
+        for created in created_column
+    ]
+    return list(
+        zip(
+            titles,
+            contents,
+            category_column,
+            tag_column,
+            created_column,
+            updated_column,
+            user_column,
+        )
+    )
+
+
+async def upsert_users(session, count: int, password: str) -> list[int]:
+    hashed_password = PasswordHelper().hash(password)
+    emails = [f"seed-user-{index}@example.com" for index in range(count)]
+    for chunk in itertools.batched(emails, 5_000):
+        await session.execute(
+            insert(User)
+            .values(
+                [
+                    {
+                        "email": email,
+                        "hashed_password": hashed_password,
+                        "is_active": True,
+                        "is_superuser": False,
+                        "is_verified": True,
+                    }
+                    for email in chunk
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+        )
+    result = await session.execute(
+        select(User.id).where(User.email.in_(emails)).order_by(User.id)
+    )
+    return list(result.scalars())
+
+
+async def upsert_categories(session, names: list[str]) -> list[int]:
+    await session.execute(
+        insert(Category)
+        .values([{"name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=[Category.name])
+    )
+    result = await session.execute(
+        select(Category.id, Category.name).where(Category.name.in_(names))
+    )
+    ids = {name: category_id for category_id, name in result.all()}
+    # Keep the generated order so the Zipf ranks are deterministic
+    return [ids[name] for name in names]
+
+
+async def seed(
+    users: int,
+    categories: int,
+    posts: int,
+    seed_value: int,
+    batch_size: int,
+    days: int,
+    password: str,
+) -> None:
+    rng = random.Random(seed_value)
+    words = make_words(rng, 5_000)
+    corpus = make_corpus(rng, words, 4_000_000)
+    tags = sorted(set(words[:TAG_VOCABULARY]))
+    names = category_names(rng, words, categories)
+    now = datetime(2025, 1, 1)
+
+    async with db_helper.session_factory() as session:
+        user_ids = await upsert_users(session, users, password)
+        category_ids = await upsert_categories(session, names)
+        await session.commit()
+    logger.info("Seeded %d users and %d categories", len(user_ids), len(category_ids))
+
+    def make_batch(batch: int) -> list[tuple]:
+        count = min(batch_size, posts - batch * batch_size)
+        return generate_posts(
+            seed_value, batch, count, corpus, user_ids, category_ids, tags, now, days
+        )
+
+    batches = (posts + batch_size - 1) // batch_size
+    started = perf_counter()
+    async with db_helper.engine.connect() as conn:
+        raw_connection = await conn.get_raw_connection()
+        driver = raw_connection.driver_connection
+        pending = (
+            asyncio.create_task(asyncio.to_thread(make_batch, 0)) if batches else None
+        )
+        for batch in range(batches):
+            records = await pending
+            if batch + 1 < batches:
+                pending = asyncio.create_task(asyncio.to_thread(make_batch, batch + 1))
+            await driver.copy_records_to_table(
+                "posts",
+                records=records,
+                columns=POST_COLUMNS,
+            )
+            written = batch * batch_size + len(records)
+            logger.info(
+                "Copied %d/%d posts (%.0f rows/s)",
+                written,
+                posts,
+                written / (perf_counter() - started),
+            )
+        await conn.execute(text("ANALYZE posts"))
+        await conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed a synthetic dataset")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--categories", type=int, default=300)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=365, help="created_at spread")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+    if args.users < 1 or args.categories < 1:
+        parser.error("--users and --categories must be positive")
+
+    asyncio.run(
+        seed(
+            users=args.users,
+            categories=args.categories,
+            posts=args.posts,
+            seed_value=args.seed,
+            batch_size=args.batch_size,
+            days=args.days,
+            password=args.password,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
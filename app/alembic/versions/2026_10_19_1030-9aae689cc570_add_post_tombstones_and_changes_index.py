@@ -0,0 +1,55 @@
+"""Add post tombstones and changes index
+
+Revision ID: 9aae689cc570
+Revises: 37c6954a07c0
+Create Date: 2026-10-19 10:30:41.218305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9aae689cc570"
+down_revision: Union[str, None] = "37c6954a07c0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "post_tombstones",
+        sa.Column("post_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("post_id", name=op.f("pk_post_tombstones")),
+    )
+    op.create_index(
+        op.f("ix_post_tombstones_deleted_at_post_id"),
+        "post_tombstones",
+        ["deleted_at", "post_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_posts_updated_at_id"),
+        "posts",
+        ["updated_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_posts_updated_at_id"), table_name="posts")
+    op.drop_index(
+        op.f("ix_post_tombstones_deleted_at_post_id"),
+        table_name="post_tombstones",
+    )
+    op.drop_table("post_tombstones")
@@ -0,0 +1,42 @@
+"""Add posts ordering indexes
+
+Revision ID: b3405977c7ee
+Revises: 9aae689cc570
+Create Date: 2026-10-19 11:15:08.573941
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3405977c7ee"
+down_revision: Union[str, None] = "9aae689cc570"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_posts_created_at_id"),
+        "posts",
+        [sa.text("created_at DESC"), "id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_posts_title_id"),
+        "posts",
+        ["title", "id"],
+        unique=False,
+    )
+    # Covered by the leading column of ix_posts_title_id
+    op.drop_index(op.f("ix_posts_title"), table_name="posts")
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_posts_title"), "posts", ["title"], unique=False)
+    op.drop_index(op.f("ix_posts_title_id"), table_name="posts")
+    op.drop_index(op.f("ix_posts_created_at_id"), table_name="posts")
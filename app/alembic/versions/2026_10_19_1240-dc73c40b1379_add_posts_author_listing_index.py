@@ -0,0 +1,35 @@
+"""Add posts author listing index
+
+Revision ID: dc73c40b1379
+Revises: b3405977c7ee
+Create Date: 2026-10-19 12:40:52.106274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "dc73c40b1379"
+down_revision: Union[str, None] = "b3405977c7ee"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_posts_user_id_created_at_id"),
+        "posts",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    # Covered by the leading column of ix_posts_user_id_created_at_id
+    op.drop_index(op.f("ix_posts_user_id"), table_name="posts")
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_posts_user_id"), "posts", ["user_id"], unique=False)
+    op.drop_index(op.f("ix_posts_user_id_created_at_id"), table_name="posts")
@@ -0,0 +1,37 @@
+"""Add posts view count
+
+Revision ID: 57c4099f620a
+Revises: dc73c40b1379
+Create Date: 2026-10-19 14:10:37.482913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "57c4099f620a"
+down_revision: Union[str, None] = "dc73c40b1379"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts",
+        sa.Column("view_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index(
+        op.f("ix_posts_view_count_id"),
+        "posts",
+        [sa.text("view_count DESC"), "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_posts_view_count_id"), table_name="posts")
+    op.drop_column("posts", "view_count")
@@ -1,20 +1,26 @@
 from fastapi import APIRouter, Depends
 from fastapi.security import HTTPBearer
 
+from api.dependencies.deadline import Deadline
 from core.config import settings
 from .auth import router as auth_router
 from .users import router as users_router
+from .user_posts import router as user_posts_router
 from .messages import router as messages_router
 from .posts import router as posts_router
+from .internal import router as internal_router
 
 http_bearer = HTTPBearer(auto_error=False)
 router = APIRouter(
     prefix=settings.api.v1.prefix,
-    dependencies=[Depends(http_bearer)],
+    dependencies=[Depends(http_bearer), Depends(Deadline())],
 )
 router.include_router(auth_router)
 router.include_router(users_router)
+router.include_router(user_posts_router)
 
 router.include_router(messages_router)
 
 router.include_router(posts_router)
+
+router.include_router(internal_router)
@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from api.dependencies.authentication import authentication_backend
+from api.dependencies.concurrency import ConcurrencyLimit
 from core.schemas.user import UserRead, UserCreate
 from .fastapi_users import fastapi_users
 from core.config import settings
@@ -8,6 +9,8 @@ from core.config import settings
 router = APIRouter(
     prefix=settings.api.v1.auth,
     tags=["Auth"],
+    # Password hashing runs on the event loop, so only a few at a time
+    dependencies=[Depends(ConcurrencyLimit("auth"))],
 )
 
 # /login
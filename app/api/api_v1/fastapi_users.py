@@ -1,3 +1,6 @@
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, status
 from fastapi_users import FastAPIUsers
 
 from core.types.user_id import UserIdType
@@ -12,5 +15,17 @@ fastapi_users = FastAPIUsers[User, UserIdType](
     [authentication_backend],
 )
 
-current_active_user = fastapi_users.current_user(active=True)
+current_active_user_optional = fastapi_users.current_user(active=True, optional=True)
+
+
+async def current_active_user(
+    user: Annotated[User | None, Depends(current_active_user_optional)],
+) -> User:
+    # Shares the token lookup with current_active_user_optional,
+    # which FastAPI resolves once per request
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return user
+
+
 current_active_superuser = fastapi_users.current_user(active=True, superuser=True)
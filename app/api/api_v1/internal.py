@@ -0,0 +1,43 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from api.api_v1.fastapi_users import current_active_superuser
+from core.config import settings
+from core.models import User, db_helper
+from core.models.pool_metrics import pool_snapshot
+
+router = APIRouter(
+    prefix=settings.api.v1.internal,
+    tags=["Internal"],
+)
+
+
+@router.get(
+    "/pool",
+    summary="Database pool metrics",
+    description="Checked-out/overflow gauges, checkout wait and connect latency",
+)
+async def get_pool_metrics(
+    user: Annotated[
+        User,
+        Depends(current_active_superuser),
+    ],
+):
+    return pool_snapshot()
+
+
+@router.get(
+    "/slow-queries",
+    summary="Recent slow queries",
+    description="Statements over the slow-query threshold with their EXPLAIN plans",
+)
+async def get_slow_queries(
+    user: Annotated[
+        User,
+        Depends(current_active_superuser),
+    ],
+):
+    if db_helper.slow_query_log is None:
+        return []
+    return db_helper.slow_query_log.recent()
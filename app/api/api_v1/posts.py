@@ -1,39 +1,99 @@
-import json
-from typing import Annotated
+from datetime import datetime
+from functools import partial
+from typing import Annotated, Awaitable, Callable, Iterable
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.api_v1.fastapi_users import current_active_user
-from api.dependencies.posts import post_by_id, check_post_author
-from core.cache import get_redis_client
+from api.dependencies.concurrency import ConcurrencyLimit
+from api.dependencies.deadline import Deadline
+from api.dependencies.posts import post_by_id, raise_post_not_owned, search_query
+from api.dependencies.rate_limit import RateLimit, UserRateLimit
+from core.cache import (
+    CACHE_ERRORS,
+    cache_client,
+    cache_requests_total,
+    invalidate_author_posts,
+)
 from core.config import settings
 from core.constants import COMMON_RESPONSES
+from core.exceptions import GatewayTimeoutError
+from core.latest_posts import latest_posts
 from core.logger import logger
-from core.models import db_helper, User, Post
-from core.schemas.post import PostRead, PostCreate, PostUpdate
+from core.models import db_helper, User
+from core.suggest import Term, suggest_index, publish_suggest_changes
+from core.schemas.post import (
+    PostRead,
+    PostCreate,
+    PostUpdate,
+    PostChanges,
+    Suggestion,
+)
+from core.types.user_id import UserIdType
 from crud import posts as posts_crud
+from crud.post_list_cache import post_list_cache
+from crud.post_write_batcher import post_write_batcher
+from crud.view_counter import view_counter
+from utils import encode_cursor, decode_cursor
 
 router = APIRouter(prefix=settings.api.v1.posts, tags=["Posts"])
 
+WRITE_CACHE_ERRORS = (*CACHE_ERRORS, GatewayTimeoutError)
+
+
+async def update_caches_after_write(
+    user_id: UserIdType,
+    update_feed: Callable[[], Awaitable[None]],
+    add: Iterable[Term] = (),
+    remove: Iterable[Term] = (),
+) -> None:
+    """
+    Brings the caches in line with a committed write. Cache failures,
+    or the request's deadline running out, must not fail the request:
+    clients would repeat the write.
+    """
+    try:
+        await invalidate_author_posts(user_id)
+    except WRITE_CACHE_ERRORS:
+        # Their hash expires settings.redis.ex seconds after it was filled
+        logger.warning("Could not drop cached pages of user %r", user_id)
+    try:
+        await update_feed()
+    except WRITE_CACHE_ERRORS:
+        logger.warning("Could not update the latest posts feed")
+        latest_posts.mark_dirty()
+    try:
+        await publish_suggest_changes(cache_client, add=add, remove=remove)
+    except WRITE_CACHE_ERRORS:
+        logger.warning("Could not publish suggest index changes")
+
 
 @router.get(
     "",
     response_model=list[PostRead],
     summary="Get all posts",
     description="Get list of posts with filtering and pagination",
+    responses={
+        status.HTTP_429_TOO_MANY_REQUESTS: COMMON_RESPONSES[
+            status.HTTP_429_TOO_MANY_REQUESTS
+        ],
+        status.HTTP_503_SERVICE_UNAVAILABLE: COMMON_RESPONSES[
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        ],
+    },
+    dependencies=[
+        Depends(Deadline("posts_list")),
+        Depends(RateLimit("posts_search", query_param="search")),
+        Depends(ConcurrencyLimit("cached_read")),
+    ],
 )
 async def get_posts(
     session: Annotated[
         AsyncSession,
         Depends(db_helper.session_getter),
     ],
-    redis_client=Depends(get_redis_client),
-    search: str = Query(
-        None,
-        min_length=2,
-        description="Фильтрация постов по заголовку или категории (минимум 2 символа).",
-    ),
+    search: Annotated[str | None, Depends(search_query)],
     limit: int = Query(
         10,
         ge=1,
@@ -47,42 +107,170 @@ async def get_posts(
     ),
     order: str = Query(
         "id",
-        enum=["id", "title", "created_at"],
-        description="Сортировка по полю (id, title, created_at)",
+        enum=["id", "title", "created_at", "views"],
+        description="Сортировка по полю (id, title, created_at, views)",
+    ),
+    category: str = Query(
+        None,
+        description="Только посты этой категории (точное название)",
     ),
 ):
     logger.info(
-        "Get posts with params: search=%s, limit=%d, offset=%d, order=%s",
+        "Get posts with params: search=%s, limit=%d, offset=%d, order=%s, category=%s",
         search,
         limit,
         offset,
         order,
+        category,
     )
-    cache_key = f"posts_cache:{search}:{limit}:{offset}:{order}"
-    cached = await redis_client.get(cache_key)
-    if cached:
-        posts = json.loads(cached)
-        logger.info("Found %r cached posts", len(posts))
-        return posts
+    # Cache errors (or an open circuit) send the request to the database
+    # and skip cache writes instead of failing it
+    cache_available = True
+    if order == "created_at" and not search:
+        try:
+            page = await latest_posts.get_page(
+                limit=limit,
+                offset=offset,
+                category=category,
+            )
+        except CACHE_ERRORS:
+            page, cache_available = None, False
+        if page is not None:
+            cache_requests_total.inc(labels=("latest_posts", "hit"))
+            logger.info("Served posts from the latest posts feed")
+            return Response(page, media_type="application/json")
+        if cache_available:
+            cache_requests_total.inc(labels=("latest_posts", "miss"))
 
-    posts = await posts_crud.get_all_posts(
+    # Served from aligned windows shared by every limit/offset that
+    # overlaps them; stale windows are served while they are refreshed
+    page = await post_list_cache.get_page(
         session=session,
         search=search,
         limit=limit,
         offset=offset,
         order=order,
+        category=category,
+        use_cache=cache_available,
+    )
+    return Response(page, media_type="application/json")
+
+
+def parse_changes_cursor(
+    since: str | None,
+) -> tuple[tuple[datetime, int], tuple[datetime, int]]:
+    if since is None:
+        return (datetime.min, 0), (datetime.min, 0)
+    try:
+        values = decode_cursor(since)
+        posts_at, post_id = values["posts"]
+        deleted_at, deleted_id = values["deleted"]
+        return (
+            (datetime.fromisoformat(posts_at), int(post_id)),
+            (datetime.fromisoformat(deleted_at), int(deleted_id)),
+        )
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor",
+        )
+
+
+@router.get(
+    "/changes",
+    response_model=PostChanges,
+    summary="Get changed posts",
+    description=(
+        "Posts created or updated and ids of posts deleted since the cursor. "
+        "Start without `since` and pass the returned cursor on the next call; "
+        "repeat while `has_more` is true."
+    ),
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid sync cursor"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: COMMON_RESPONSES[
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        ],
+    },
+    dependencies=[
+        Depends(Deadline("post_changes")),
+        Depends(ConcurrencyLimit("db_read")),
+    ],
+)
+async def get_post_changes(
+    session: Annotated[
+        AsyncSession,
+        Depends(db_helper.session_getter),
+    ],
+    since: str | None = Query(
+        None,
+        description="Cursor returned by the previous call",
+    ),
+    limit: int = Query(
+        100,
+        ge=1,
+        le=settings.sync.max_limit,
+        description="Maximum number of changed and of deleted posts",
+    ),
+):
+    posts_after, deleted_after = parse_changes_cursor(since)
+    logger.info("Get post changes after %s / %s", posts_after, deleted_after)
+    # One extra row tells whether another page follows
+    posts = await posts_crud.get_changed_posts(
+        session=session,
+        after=posts_after,
+        limit=limit + 1,
+        settle_seconds=settings.sync.settle_seconds,
+    )
+    deleted = await posts_crud.get_deleted_posts(
+        session=session,
+        after=deleted_after,
+        limit=limit + 1,
+        settle_seconds=settings.sync.settle_seconds,
+    )
+    await session.close()
+    has_more = len(posts) > limit or len(deleted) > limit
+    posts, deleted = posts[:limit], deleted[:limit]
+    if posts:
+        posts_after = (posts[-1].updated_at, posts[-1].id)
+    if deleted:
+        deleted_after = deleted[-1]
+    cursor = encode_cursor(
+        {
+            "posts": [posts_after[0].isoformat(), posts_after[1]],
+            "deleted": [deleted_after[0].isoformat(), deleted_after[1]],
+        }
     )
-    logger.info("Found %r posts", len(posts))
-    posts_data = [
-        PostRead.model_validate(post).model_dump(mode="json") for post in posts
-    ]
-    await redis_client.set(
-        cache_key,
-        json.dumps(posts_data),
-        ex=settings.redis.ex,
+    logger.info("Found %r changed and %r deleted posts", len(posts), len(deleted))
+    return PostChanges(
+        posts=posts,
+        deleted=[post_id for _, post_id in deleted],
+        cursor=cursor,
+        has_more=has_more,
     )
-    logger.info("Saved %r for %r seconds", cache_key, settings.redis.ex)
-    return posts
+
+
+@router.get(
+    "/suggest",
+    response_model=list[Suggestion],
+    summary="Suggest titles and categories",
+    description="Post titles and category names starting with the prefix",
+)
+async def suggest_posts(
+    prefix: str = Query(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="Начало заголовка или названия категории",
+    ),
+    limit: int = Query(
+        10,
+        ge=1,
+        le=50,
+        description="Лимит подсказок (1-50)",
+    ),
+):
+    # Served from this worker's memory, no I/O
+    return suggest_index.suggest(prefix, limit)
 
 
 @router.get(
@@ -91,12 +279,17 @@ async def get_posts(
     summary="Get post by ID",
     responses={
         status.HTTP_404_NOT_FOUND: COMMON_RESPONSES[status.HTTP_404_NOT_FOUND],
+        status.HTTP_503_SERVICE_UNAVAILABLE: COMMON_RESPONSES[
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        ],
     },
+    dependencies=[Depends(ConcurrencyLimit("db_read"))],
 )
 async def get_post(
     post: Annotated[PostRead, Depends(post_by_id)],
 ):
     logger.info("Get post ID: %d", post.id)
+    view_counter.record(post.id)
     return post
 
 
@@ -106,8 +299,18 @@ async def get_post(
     status_code=status.HTTP_201_CREATED,
     summary="Create new post",
     responses={
-        status.HTTP_401_UNAUTHORIZED: COMMON_RESPONSES[status.HTTP_401_UNAUTHORIZED]
+        status.HTTP_401_UNAUTHORIZED: COMMON_RESPONSES[status.HTTP_401_UNAUTHORIZED],
+        status.HTTP_429_TOO_MANY_REQUESTS: COMMON_RESPONSES[
+            status.HTTP_429_TOO_MANY_REQUESTS
+        ],
+        status.HTTP_503_SERVICE_UNAVAILABLE: COMMON_RESPONSES[
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        ],
     },
+    dependencies=[
+        Depends(UserRateLimit("posts_write")),
+        Depends(ConcurrencyLimit("write")),
+    ],
 )
 async def create_post(
     session: Annotated[
@@ -125,10 +328,21 @@ async def create_post(
         user.id,
         post_create.title,
     )
-    new_post = await posts_crud.create_post(
-        session=session,
-        post_create=post_create,
+    if settings.db.write_batching.enabled:
+        new_post = await post_write_batcher.create_post(
+            post_create=post_create,
+            user_id=user.id,
+        )
+    else:
+        new_post = await posts_crud.create_post(
+            session=session,
+            post_create=post_create,
+            user_id=user.id,
+        )
+    await update_caches_after_write(
         user_id=user.id,
+        update_feed=partial(latest_posts.add, new_post),
+        add=[(new_post.title, "title"), (new_post.category, "category")],
     )
     logger.info(
         "Post created successfully. ID: %r, Author: %r",
@@ -143,32 +357,49 @@ async def create_post(
     response_model=PostRead,
     summary="Update existing post",
     responses=COMMON_RESPONSES,
+    dependencies=[
+        Depends(UserRateLimit("posts_write")),
+        Depends(ConcurrencyLimit("write")),
+    ],
 )
 async def update_post(
     session: Annotated[
         AsyncSession,
         Depends(db_helper.session_getter),
     ],
-    user_post: Annotated[
-        tuple[User, Post],
-        Depends(check_post_author),
+    user: Annotated[
+        User,
+        Depends(current_active_user),
     ],
+    post_id: int,
     post_update: PostUpdate,
 ):
-    user, post = user_post
     logger.info(
         "User %r updating post ID: %r",
         user.id,
-        post.id,
+        post_id,
     )
-    updated_post = await posts_crud.update_post(
+    updated = await posts_crud.update_post(
         session=session,
-        post=post,
+        post_id=post_id,
+        user_id=user.id,
         post_update=post_update,
     )
+    if updated is None:
+        await raise_post_not_owned(session=session, post_id=post_id)
+    updated_post = updated.post
+    await update_caches_after_write(
+        user_id=user.id,
+        update_feed=partial(latest_posts.update, updated_post),
+        add=[(updated_post.title, "title"), (updated_post.category, "category")],
+        remove=[
+            (updated.previous_title, "title"),
+            (updated.previous_category, "category"),
+        ],
+    )
     logger.info(
         "Post ID %r updated successfully. Updated fields: %r by user with %r id",
-        post.id,
+        post_id,
         post_update.model_dump(exclude_unset=True),
         user.id,
     )
@@ -180,25 +411,37 @@ async def update_post(
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Delete post",
     responses=COMMON_RESPONSES,
+    dependencies=[
+        Depends(UserRateLimit("posts_write")),
+        Depends(ConcurrencyLimit("write")),
+    ],
 )
 async def delete_post(
     session: Annotated[
         AsyncSession,
         Depends(db_helper.session_getter),
     ],
-    user_post: Annotated[
-        tuple[User, Post],
-        Depends(check_post_author),
+    user: Annotated[
+        User,
+        Depends(current_active_user),
     ],
+    post_id: int,
 ) -> None:
-    user, post = user_post
-    logger.info("Deleting post ID: %r", post.id)
-    await posts_crud.delete_post(
+    logger.info("Deleting post ID: %r", post_id)
+    deleted_post = await posts_crud.delete_post(
         session=session,
-        post=post,
+        post_id=post_id,
+        user_id=user.id,
+    )
+    if deleted_post is None:
+        await raise_post_not_owned(session=session, post_id=post_id)
+    await update_caches_after_write(
+        user_id=user.id,
+        update_feed=partial(latest_posts.remove, post_id),
+        remove=[(deleted_post.title, "title"), (deleted_post.category, "category")],
     )
     logger.info(
         "Post ID %r deleted successfully by user with %r id",
-        post.id,
+        post_id,
         user.id,
     )
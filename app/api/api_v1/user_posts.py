@@ -0,0 +1,195 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.api_v1.fastapi_users import current_active_user
+from api.dependencies.concurrency import ConcurrencyLimit
+from api.dependencies.deadline import Deadline
+from core.cache import (
+    CACHE_ERRORS,
+    get_cache_client,
+    cache_requests_total,
+    author_posts_key,
+    author_posts_version_key,
+)
+from core.cache.codec import CacheCodecError, encode_value, decode_value
+from core.config import settings
+from core.constants import COMMON_RESPONSES
+from core.load_shedding import concurrency_slot
+from core.logger import logger
+from core.models import db_helper, User
+from core.request_cost import measure_serialization
+from core.schemas.post import PostPage
+from core.types.user_id import UserIdType
+from crud import posts as posts_crud
+from utils import encode_cursor, decode_cursor
+
+router = APIRouter(
+    prefix=settings.api.v1.users,
+    tags=["Posts"],
+    dependencies=[
+        Depends(Deadline("author_posts")),
+        Depends(ConcurrencyLimit("cached_read")),
+    ],
+)
+
+
+def parse_page_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if cursor is None:
+        return None
+    try:
+        values = decode_cursor(cursor)
+        return datetime.fromisoformat(values["created_at"]), int(values["id"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid page cursor",
+        )
+
+
+async def get_author_page(
+    session: AsyncSession,
+    cache_client,
+    user_id: UserIdType,
+    cursor: str | None,
+    limit: int,
+) -> bytes:
+    """
+    Returns the page as JSON bytes, from the author's cache hash when possible.
+    """
+    before = parse_page_cursor(cursor)
+    cache_key = author_posts_key(user_id)
+    cache_field = f"{cursor}:{limit}"
+    cached = version = None
+    cache_available = True
+    try:
+        async with cache_client.pipeline(transaction=False) as pipe:
+            pipe.get(author_posts_version_key(user_id))
+            pipe.hget(cache_key, cache_field)
+            version, cached = await pipe.execute()
+    except CACHE_ERRORS:
+        cache_available = False
+    # Pages are stored as b"<version>\n<encoded page>"
+    version = version or b"0"
+    if cached:
+        cached_version, _, value = cached.partition(b"\n")
+        try:
+            page = decode_value(value) if cached_version == version else None
+        except CacheCodecError:
+            # A miss: the page is loaded again and overwritten
+            logger.warning("Could not decode a cached page of user %r", user_id)
+            page = None
+        if page is not None:
+            cache_requests_total.inc(labels=("author_posts", "hit"))
+            return page
+
+    cache_requests_total.inc(
+        labels=("author_posts", "miss" if cache_available else "unavailable")
+    )
+    async with concurrency_slot("db_read"):
+        # One extra row tells whether another page follows
+        posts = await posts_crud.get_author_posts(
+            session=session,
+            user_id=user_id,
+            limit=limit + 1,
+            before=before,
+        )
+        if not posts and before is None:
+            if not await posts_crud.user_exists(session=session, user_id=user_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"User {user_id} not found",
+                )
+        await session.close()
+    logger.info("Found %r posts of user %r", len(posts), user_id)
+
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(
+            {"created_at": posts[-1].created_at.isoformat(), "id": posts[-1].id}
+        )
+    with measure_serialization():
+        page_json = PostPage(posts=posts, next_cursor=next_cursor).model_dump_json()
+        page_json = page_json.encode()
+    if not cache_available:
+        return page_json
+    try:
+        async with cache_client.pipeline(transaction=False) as pipe:
+            pipe.hset(cache_key, cache_field, version + b"\n" + encode_value(page_json))
+            # Only when the hash is created, fills must not keep it alive
+            pipe.expire(cache_key, settings.redis.ex, nx=True)
+            await pipe.execute()
+    except CACHE_ERRORS:
+        pass
+    return page_json
+
+
+@router.get(
+    "/me/posts",
+    response_model=PostPage,
+    summary="Get my posts",
+    description="Posts of the current user, newest first, with cursor pagination",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: COMMON_RESPONSES[status.HTTP_401_UNAUTHORIZED]
+    },
+)
+async def get_my_posts(
+    session: Annotated[
+        AsyncSession,
+        Depends(db_helper.session_getter),
+    ],
+    user: Annotated[
+        User,
+        Depends(current_active_user),
+    ],
+    cache_client=Depends(get_cache_client),
+    cursor: str | None = Query(
+        None,
+        description="`next_cursor` of the previous page",
+    ),
+    limit: int = Query(
+        10,
+        ge=1,
+        le=100,
+        description="Лимит постов на странице (1-100)",
+    ),
+):
+    logger.info("Get own posts of user %r, cursor=%s, limit=%d", user.id, cursor, limit)
+    page_json = await get_author_page(session, cache_client, user.id, cursor, limit)
+    return Response(page_json, media_type="application/json")
+
+
+@router.get(
+    "/{user_id}/posts",
+    response_model=PostPage,
+    summary="Get posts of a user",
+    description="Posts of the user, newest first, with cursor pagination",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid page cursor"},
+        status.HTTP_404_NOT_FOUND: {"description": "User not found"},
+    },
+)
+async def get_user_posts(
+    session: Annotated[
+        AsyncSession,
+        Depends(db_helper.session_getter),
+    ],
+    user_id: UserIdType,
+    cache_client=Depends(get_cache_client),
+    cursor: str | None = Query(
+        None,
+        description="`next_cursor` of the previous page",
+    ),
+    limit: int = Query(
+        10,
+        ge=1,
+        le=100,
+        description="Лимит постов на странице (1-100)",
+    ),
+):
+    logger.info("Get posts of user %r, cursor=%s, limit=%d", user_id, cursor, limit)
+    page_json = await get_author_page(session, cache_client, user_id, cursor, limit)
+    return Response(page_json, media_type="application/json")
@@ -0,0 +1,15 @@
+from core.load_shedding import concurrency_slot
+
+
+class ConcurrencyLimit:
+    """
+    Route dependency holding a slot of the
+    `settings.load_shedding.classes[class_name]` budget for the request.
+    """
+
+    def __init__(self, class_name: str):
+        self.class_name = class_name
+
+    async def __call__(self):
+        async with concurrency_slot(self.class_name):
+            yield
@@ -0,0 +1,18 @@
+from core.config import settings
+from core.deadline import deadline
+
+
+class Deadline:
+    """
+    Route dependency giving the request `settings.deadlines.routes[route]`
+    seconds, or the default deadline. Declared on a route it replaces the
+    deadline of the enclosing router.
+    """
+
+    def __init__(self, route: str | None = None):
+        self.route = route
+
+    async def __call__(self):
+        seconds = settings.deadlines.routes.get(self.route, settings.deadlines.default)
+        with deadline(seconds):
+            yield
@@ -1,12 +1,15 @@
-from typing import Annotated
+from typing import Annotated, NoReturn
 
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Query
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.api_v1.fastapi_users import current_active_user
-from core.models import db_helper, Post, User
+from core.cache.windows import normalize_search
+from core.models import db_helper, Post
 from crud import posts
 
+SEARCH_MIN_LENGTH = 2
+
 
 async def post_by_id(
     session: Annotated[
@@ -27,19 +30,52 @@ async def post_by_id(
     return post
 
 
-async def check_post_author(
-    user: Annotated[
-        User,
-        Depends(current_active_user),
-    ],
-    post: Annotated[
-        Post,
-        Depends(post_by_id),
-    ],
-) -> tuple[User, Post]:
-    if user.id != post.user_id:
+async def raise_post_not_owned(
+    session: AsyncSession,
+    post_id: int,
+) -> NoReturn:
+    """
+    Called after an ownership-checked write matched no rows:
+    tells a missing post (404) apart from someone else's (403).
+    """
+    author_id = await posts.get_post_author_id(
+        session=session,
+        post_id=post_id,
+    )
+    if author_id is None:
         raise HTTPException(
-            status_code=403,
-            detail="You cannot change this post.",
+            status_code=404,
+            detail=f"Post {post_id} not found",
+        )
+    raise HTTPException(
+        status_code=403,
+        detail="You cannot change this post.",
+    )
+
+
+def search_query(
+    search: str = Query(
+        None,
+        description="Фильтрация постов по заголовку или категории (минимум 2 символа).",
+    ),
+) -> str | None:
+    """
+    The normalized search. Its length is checked after normalizing,
+    so "  " or " a " are rejected instead of listing every post.
+    """
+    if search is None:
+        return None
+    normalized = normalize_search(search)
+    if normalized is None or len(normalized) < SEARCH_MIN_LENGTH:
+        raise RequestValidationError(
+            [
+                {
+                    "type": "string_too_short",
+                    "loc": ("query", "search"),
+                    "msg": f"String should have at least {SEARCH_MIN_LENGTH} characters",
+                    "input": search,
+                    "ctx": {"min_length": SEARCH_MIN_LENGTH},
+                }
+            ]
         )
-    return user, post
+    return normalized
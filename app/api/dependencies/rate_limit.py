@@ -0,0 +1,59 @@
+from typing import Annotated
+
+from fastapi import Depends, Request
+
+from api.api_v1.fastapi_users import current_active_user_optional
+from core.config import settings
+from core.exceptions import TooManyRequestsError
+from core.models import User
+from core.rate_limit import rate_limiter, rate_limited_total
+
+
+class RateLimit:
+    """
+    Route dependency applying the `settings.rate_limit.rules[rule_name]`
+    token bucket per client IP. With `query_param`, only requests that
+    carry it count, e.g. searches on the posts list.
+    """
+
+    def __init__(self, rule_name: str, query_param: str | None = None):
+        self.rule_name = rule_name
+        self.query_param = query_param
+
+    async def __call__(self, request: Request) -> None:
+        await self.take(request, client_ip_key(request))
+
+    async def take(self, request: Request, client: str) -> None:
+        rule = settings.rate_limit.rules.get(self.rule_name)
+        if not settings.rate_limit.enabled or rule is None:
+            return
+        if self.query_param and not request.query_params.get(self.query_param):
+            return
+        retry_after = await rate_limiter.take(
+            key=f"rate_limit:{self.rule_name}:{client}",
+            rule=rule,
+        )
+        if retry_after is not None:
+            rate_limited_total.inc(labels=(self.rule_name,))
+            raise TooManyRequestsError(retry_after=retry_after)
+
+
+class UserRateLimit(RateLimit):
+    """
+    Same, per authenticated user. Requests whose token does not validate
+    are charged to the client IP, so new tokens do not get new buckets.
+    """
+
+    async def __call__(
+        self,
+        request: Request,
+        user: Annotated[User | None, Depends(current_active_user_optional)],
+    ) -> None:
+        if user is None:
+            await self.take(request, client_ip_key(request))
+        else:
+            await self.take(request, f"user:{user.id}")
+
+
+def client_ip_key(request: Request) -> str:
+    return f"ip:{request.client.host if request.client else None}"
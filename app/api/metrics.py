@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.config import settings
+from core.metrics import collect, render_prometheus
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get(
+    settings.metrics.path,
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    include_in_schema=False,
+)
+async def get_metrics():
+    metrics = await collect(
+        settings.metrics.multiprocess_dir,
+        stale_after=settings.metrics.flush_interval * settings.metrics.stale_intervals,
+    )
+    return PlainTextResponse(
+        render_prometheus(metrics),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
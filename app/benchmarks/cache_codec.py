@@ -0,0 +1,132 @@
+"""
+Memory and CPU cost of cached post list pages.
+
+    python -m benchmarks.cache_codec
+    python -m benchmarks.cache_codec --limits 10 100 --levels 1 6 9
+
+Pages are built from the synthetic posts of `actions.seed`, encoded with
+`core.cache.codec` at every compression level and compared with the
+plain JSON they used to be stored as.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+import orjson
+
+from actions.seed import make_corpus, make_words, generate_posts
+from benchmarks.load_test import RESULTS_DIR, git_commit
+from core.cache.codec import encode_value, decode_value
+from core.schemas.post import PostRead
+
+
+def make_page(seed: int, limit: int) -> bytes:
+    rng = random.Random(seed)
+    words = make_words(rng, 5_000)
+    corpus = make_corpus(rng, words, 1_000_000)
+    rows = generate_posts(
+        seed=seed,
+        batch=0,
+        count=limit,
+        corpus=corpus,
+        user_ids=[1],
+        category_ids=list(range(20)),
+        tags=words[:500],
+        now=datetime.now(),
+        days=365,
+    )
+    posts = [
+        PostRead(
+            id=index,
+            title=title,
+            content=content,
+            category=f"category-{category_id}",
+            tags=tags,
+            user="author@example.com",
+            created_at=created_at,
+            updated_at=updated_at,
+        ).model_dump(mode="json")
+        for index, (
+            title,
+            content,
+            category_id,
+            tags,
+            created_at,
+            updated_at,
+            _,
+        ) in enumerate(rows, start=1)
+    ]
+    return orjson.dumps(posts)
+
+
+def best_of(repeat: int, call) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        call()
+        timings.append(perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure(page: bytes, level: int | None, repeat: int) -> dict:
+    # level None stores the page as is, behind the format byte
+    min_size = len(page) + 1 if level is None else 0
+    value = encode_value(page, min_size=min_size, level=level or 1)
+    assert decode_value(value) == page
+    return {
+        "level": level,
+        "stored_bytes": len(value),
+        "saved_pct": round((1 - len(value) / len(page)) * 100, 1),
+        "encode_us": round(
+            best_of(repeat, lambda: encode_value(page, min_size, level or 1)) * 1e6, 1
+        ),
+        "decode_us": round(best_of(repeat, lambda: decode_value(value)) * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path of the JSON report")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'posts':>6}{'json':>10}{'level':>7}{'stored':>10}{'saved':>8}"
+        f"{'encode us':>11}{'decode us':>11}"
+    )
+    for limit in args.limits:
+        page = make_page(args.seed, limit)
+        for level in (None, *args.levels):
+            row = {"posts": limit, "json_bytes": len(page)} | measure(
+                page, level, args.repeat
+            )
+            results.append(row)
+            print(
+                f"{limit:>6}{len(page):>10}{level or 'raw':>7}{row['stored_bytes']:>10}"
+                f"{row['saved_pct']:>7}%{row['encode_us']:>11}{row['decode_us']:>11}"
+            )
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+    commit = report["commit"] or "unknown"
+    name = f"cache-codec-{commit}-{datetime.now():%Y%m%d%H%M%S}.json"
+    output = Path(args.output) if args.output else RESULTS_DIR / name
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"Saved {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
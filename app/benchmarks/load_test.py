@@ -0,0 +1,410 @@
+"""
+Concurrent HTTP load test for the API.
+
+Runs in-process through `httpx.ASGITransport` (the default) or against
+a running server, e.g. the docker-compose stack:
+
+    python -m benchmarks.load_test --scenario warm-cache --concurrency 50
+    python -m benchmarks.load_test --target http://localhost:8000 --duration 60
+    python -m benchmarks.load_test --scenario warm-cache --cache-backend memory
+    python -m benchmarks.load_test --compare results/a.json results/b.json
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import subprocess
+import sys
+import uuid
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Awaitable, Callable
+
+import orjson
+from httpx import ASGITransport, AsyncClient, Response
+
+POSTS_URL = "/api/v1/posts"
+RESULTS_DIR = Path(__file__).parent / "results"
+ORDERS = ("id", "title", "created_at")
+SEARCH_TERMS = ("post", "python", "fastapi", "news", "tech", "guide", "zz")
+
+SCENARIOS: dict[str, dict[str, int]] = {
+    # operation -> weight
+    "mixed": {
+        "list": 45,
+        "search": 15,
+        "get": 20,
+        "create": 8,
+        "update": 6,
+        "delete": 3,
+        "auth": 3,
+    },
+    "cold-cache": {"list": 70, "search": 30},
+    "warm-cache": {"list": 100},
+    "deep-offset": {"list": 100},
+}
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, dict[int, int]] = field(
+        default_factory=lambda: defaultdict(lambda: defaultdict(int))
+    )
+
+    def record(self, name: str, elapsed: float, response: Response) -> None:
+        if response.is_success:
+            self.latencies[name].append(elapsed)
+        else:
+            self.errors[name][response.status_code] += 1
+
+
+@dataclass
+class Context:
+    client: AsyncClient
+    scenario: str
+    token: str
+    post_ids: list[int]
+    own_post_ids: list[int]
+    email: str
+    password: str
+    flush_cache: Callable[[], Awaitable[None]] | None = None
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(stats: Stats, duration: float) -> dict[str, dict]:
+    summary = {}
+    for name in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = stats.latencies.get(name, [])
+        errors = {str(k): v for k, v in stats.errors.get(name, {}).items()}
+        row = {
+            "requests": len(latencies) + sum(errors.values()),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / duration, 2),
+        }
+        if latencies:
+            row.update(
+                {
+                    "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+                }
+            )
+        summary[name] = row
+    return summary
+
+
+def list_params(ctx: Context, search: bool = False) -> dict:
+    params = {"limit": random.choice((10, 20, 50)), "order": random.choice(ORDERS)}
+    if ctx.scenario == "warm-cache":
+        params = {
+            "limit": 10,
+            "order": "created_at",
+            "offset": random.randrange(3) * 10,
+        }
+    elif ctx.scenario == "deep-offset":
+        params["offset"] = random.randrange(10_000, 200_000, 10)
+    else:
+        params["offset"] = random.randrange(0, 100, 10)
+    if search:
+        params["search"] = random.choice(SEARCH_TERMS)
+    return params
+
+
+async def op_list(ctx: Context) -> tuple[str, Response]:
+    return "list", await ctx.client.get(POSTS_URL, params=list_params(ctx))
+
+
+async def op_search(ctx: Context) -> tuple[str, Response]:
+    return "search", await ctx.client.get(POSTS_URL, params=list_params(ctx, True))
+
+
+async def op_get(ctx: Context) -> tuple[str, Response]:
+    post_id = random.choice(ctx.post_ids) if ctx.post_ids else 1
+    return "get", await ctx.client.get(f"{POSTS_URL}/{post_id}")
+
+
+def post_payload() -> dict:
+    return {
+        "title": f"Benchmark post {uuid.uuid4().hex[:12]}",
+        "content": "Lorem ipsum dolor sit amet. " * random.randint(5, 80),
+        "category": random.choice(("bench", "python", "news", "tech")),
+        "tags": random.sample(("a", "b", "c", "d", "e"), k=2),
+    }
+
+
+async def op_create(ctx: Context) -> tuple[str, Response]:
+    response = await ctx.client.post(
+        POSTS_URL, json=post_payload(), headers=ctx.headers
+    )
+    if response.is_success:
+        ctx.own_post_ids.append(response.json()["id"])
+    return "create", response
+
+
+async def op_update(ctx: Context) -> tuple[str, Response]:
+    if not ctx.own_post_ids:
+        return await op_create(ctx)
+    post_id = random.choice(ctx.own_post_ids)
+    return "update", await ctx.client.patch(
+        f"{POSTS_URL}/{post_id}",
+        json={"title": f"Updated {uuid.uuid4().hex[:12]}"},
+        headers=ctx.headers,
+    )
+
+
+async def op_delete(ctx: Context) -> tuple[str, Response]:
+    if not ctx.own_post_ids:
+        return await op_create(ctx)
+    post_id = ctx.own_post_ids.pop(random.randrange(len(ctx.own_post_ids)))
+    return "delete", await ctx.client.delete(
+        f"{POSTS_URL}/{post_id}", headers=ctx.headers
+    )
+
+
+async def op_auth(ctx: Context) -> tuple[str, Response]:
+    return "auth", await ctx.client.post(
+        "/api/v1/auth/login",
+        data={"username": ctx.email, "password": ctx.password},
+    )
+
+
+OPERATIONS = {
+    "list": op_list,
+    "search": op_search,
+    "get": op_get,
+    "create": op_create,
+    "update": op_update,
+    "delete": op_delete,
+    "auth": op_auth,
+}
+
+
+async def login(client: AsyncClient, email: str, password: str) -> str:
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": email, "password": password},
+    )
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def prepare(ctx: Context, seed_posts: int) -> None:
+    for _ in range(seed_posts):
+        _, response = await op_create(ctx)
+        response.raise_for_status()
+    response = await ctx.client.get(POSTS_URL, params={"limit": 100})
+    response.raise_for_status()
+    ctx.post_ids = [post["id"] for post in response.json()] or ctx.own_post_ids
+    if ctx.scenario == "warm-cache":
+        for offset in (0, 10, 20):
+            await ctx.client.get(
+                POSTS_URL,
+                params={"limit": 10, "order": "created_at", "offset": offset},
+            )
+
+
+async def worker(ctx: Context, stats: Stats, mix: dict[str, int], deadline: float):
+    names = list(mix)
+    weights = list(mix.values())
+    while perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        if ctx.flush_cache is not None and name in ("list", "search"):
+            # Not part of the measured latency
+            await ctx.flush_cache()
+        operation = OPERATIONS[name]
+        started = perf_counter()
+        name, response = await operation(ctx)
+        stats.record(name, perf_counter() - started, response)
+
+
+def make_cache_flusher() -> Callable[[], Awaitable[None]]:
+    from core.cache import cache_client
+
+    async def flush() -> None:
+        keys = [key async for key in cache_client.scan_iter(match="posts_cache:*")]
+        if keys:
+            await cache_client.delete(*keys)
+
+    return flush
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    mix = parse_mix(args.mix) if args.mix else SCENARIOS[args.scenario]
+
+    async with AsyncExitStack() as stack:
+        if args.target == "inprocess":
+            from core.config import settings
+
+            # Before main is imported, it creates the cache client
+            if args.cache_backend:
+                settings.redis.backend = args.cache_backend
+            from main import main_app
+
+            await stack.enter_async_context(main_app.router.lifespan_context(main_app))
+            transport = ASGITransport(app=main_app)
+            base_url = "http://benchmark"
+        else:
+            transport = None
+            base_url = args.target
+        client = await stack.enter_async_context(
+            AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout)
+        )
+
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        password = "benchmark-password"
+        ctx = Context(
+            client=client,
+            scenario=args.scenario,
+            token=await login(client, email, password),
+            post_ids=[],
+            own_post_ids=[],
+            email=email,
+            password=password,
+        )
+        await prepare(ctx, args.seed_posts)
+        if args.scenario == "cold-cache":
+            ctx.flush_cache = make_cache_flusher()
+
+        stats = Stats()
+        started = perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(worker(ctx, stats, mix, deadline) for _ in range(args.concurrency))
+        )
+        duration = perf_counter() - started
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.target,
+        "scenario": args.scenario,
+        "cache_backend": args.cache_backend,
+        "concurrency": args.concurrency,
+        "duration_s": round(duration, 3),
+        "mix": mix,
+        "results": summarize(stats, duration),
+    }
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['scenario']} @ {report['commit']}: "
+        f"concurrency={report['concurrency']} duration={report['duration_s']}s"
+    )
+    print(
+        f"{'endpoint':<10}{'req':>8}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}  errors"
+    )
+    for name, row in report["results"].items():
+        print(
+            f"{name:<10}{row['requests']:>8}{row['throughput_rps']:>10}"
+            f"{row.get('p50_ms', '-'):>10}{row.get('p95_ms', '-'):>10}"
+            f"{row.get('p99_ms', '-'):>10}  {row['errors'] or ''}"
+        )
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    baseline = orjson.loads(Path(baseline_path).read_bytes())
+    candidate = orjson.loads(Path(candidate_path).read_bytes())
+    print(f"{baseline['commit']} -> {candidate['commit']} ({candidate['scenario']})")
+    print(f"{'endpoint':<10}{'rps':>18}{'p50 ms':>22}{'p99 ms':>22}")
+    for name, new in candidate["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p99_ms"):
+            before, after = old.get(key), new.get(key)
+            if not before or after is None:
+                cells.append(f"{'-':>22}")
+                continue
+            change = (after - before) / before * 100
+            cells.append(f"{f'{before} -> {after} ({change:+.1f}%)':>22}")
+        print(f"{name:<10}{''.join(cells)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--target", default="inprocess", help="'inprocess' or a base URL"
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument(
+        "--cache-backend",
+        choices=("redis", "memory"),
+        help="in-process only: overrides APP_CONFIG__REDIS__BACKEND",
+    )
+    parser.add_argument("--mix", help="override weights, e.g. list=80,get=20")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed-posts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path of the JSON report")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    output = (
+        Path(args.output)
+        if args.output
+        else RESULTS_DIR
+        / (
+            f"{report['scenario']}-{report['commit'] or 'unknown'}-"
+            f"{datetime.now():%Y%m%d%H%M%S}.json"
+        )
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"Saved {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from redis.exceptions import RedisError
+
+from core.config import settings, RedisConfig
+from core.metrics import Counter
+from .base import CacheBackend, CachePipeline, CachePubSub
+from .memory_backend import MemoryCache
+from .redis_backend import CacheCircuitOpenError, TimedRedis, create_redis_client
+
+cache_requests_total = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ("cache", "result"),
+)
+
+# What a failing cache backend raises, an open circuit included
+CACHE_ERRORS = (RedisError, OSError)
+
+
+def create_cache_client(config: RedisConfig) -> CacheBackend:
+    if config.backend == "memory":
+        return MemoryCache(max_keys=config.memory_max_keys)
+    return create_redis_client(config)
+
+
+cache_client = create_cache_client(settings.redis)
+
+
+async def get_cache_client() -> CacheBackend:
+    return cache_client
+
+
+# Kept well past the pages' TTL, so a page filled before a write
+# never meets a counter that started over
+AUTHOR_POSTS_VERSION_TTL = 86400
+
+
+def author_posts_key(user_id: int) -> str:
+    # One hash per author, fields are pages; dropped as a whole on writes
+    return f"author_posts:{user_id}"
+
+
+def author_posts_version_key(user_id: int) -> str:
+    # Bumped by every write; pages are stored with the version they were
+    # read at, so a page filled from data older than a write is ignored
+    return f"author_posts_version:{user_id}"
+
+
+async def invalidate_author_posts(user_id: int) -> None:
+    version_key = author_posts_version_key(user_id)
+    async with cache_client.pipeline(transaction=False) as pipe:
+        pipe.incr(version_key)
+        pipe.expire(version_key, AUTHOR_POSTS_VERSION_TTL)
+        pipe.delete(author_posts_key(user_id))
+        await pipe.execute()
+
+
+__all__ = [
+    "CACHE_ERRORS",
+    "CacheBackend",
+    "CachePipeline",
+    "CachePubSub",
+    "MemoryCache",
+    "CacheCircuitOpenError",
+    "TimedRedis",
+    "cache_requests_total",
+    "create_cache_client",
+    "cache_client",
+    "get_cache_client",
+    "author_posts_key",
+    "author_posts_version_key",
+    "invalidate_author_posts",
+]
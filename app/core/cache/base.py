@@ -0,0 +1,91 @@
+from typing import Any, AsyncIterator, Protocol, Self
+
+
+class CachePubSub(Protocol):
+    async def __aenter__(self) -> Self: ...
+
+    async def __aexit__(self, *exc_info) -> None: ...
+
+    async def subscribe(self, *channels: str) -> None: ...
+
+    async def get_message(
+        self,
+        ignore_subscribe_messages: bool = False,
+        timeout: float | None = 0.0,
+    ) -> dict[str, Any] | None: ...
+
+
+class CachePipeline(Protocol):
+    """
+    Queues the commands of `CacheBackend` (each returns the pipeline)
+    and runs them on `execute`, returning their results in order.
+    """
+
+    async def __aenter__(self) -> Self: ...
+
+    async def __aexit__(self, *exc_info) -> None: ...
+
+    def __getattr__(self, name: str) -> Any: ...
+
+    async def execute(self) -> list[Any]: ...
+
+
+class CacheBackend(Protocol):
+    """
+    The part of the `redis.asyncio.Redis` API the app uses. Redis clients
+    satisfy it as they are; `MemoryCache` implements it in process.
+    Values are returned as bytes.
+    """
+
+    async def ping(self) -> bool: ...
+
+    async def close(self) -> None: ...
+
+    async def get(self, name: str) -> bytes | None: ...
+
+    async def mget(self, keys: str | list[str], *args: str) -> list[bytes | None]: ...
+
+    async def set(
+        self,
+        name: str,
+        value: bytes | str | int,
+        ex: int | None = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> bool | None: ...
+
+    async def delete(self, *names: str) -> int: ...
+
+    async def exists(self, *names: str) -> int: ...
+
+    async def expire(self, name: str, time: int, nx: bool = False) -> bool: ...
+
+    async def pttl(self, name: str) -> int: ...
+
+    async def incr(self, name: str, amount: int = 1) -> int: ...
+
+    async def hget(self, name: str, key: str) -> bytes | None: ...
+
+    async def hset(
+        self,
+        name: str,
+        key: str | None = None,
+        value: bytes | str | None = None,
+        mapping: dict[str, bytes | str] | None = None,
+    ) -> int: ...
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> int: ...
+
+    async def zrem(self, name: str, *values: str) -> int: ...
+
+    async def zremrangebyrank(self, name: str, min: int, max: int) -> int: ...
+
+    async def zrevrange(self, name: str, start: int, end: int) -> list[bytes]: ...
+
+    def scan_iter(self, match: str | None = None) -> AsyncIterator[str | bytes]: ...
+
+    async def publish(self, channel: str, message: str | bytes) -> int: ...
+
+    def pubsub(self) -> CachePubSub: ...
+
+    def pipeline(self, transaction: bool = True) -> CachePipeline: ...
@@ -0,0 +1,57 @@
+import zlib
+
+from core.config import settings
+from core.metrics import Counter
+
+# First byte of every encoded value: the format the rest is stored in.
+# New formats get a new byte, values written by older versions stay readable.
+RAW = b"\x01"
+ZLIB = b"\x02"
+
+cache_value_bytes_total = Counter(
+    "cache_value_bytes_total",
+    "Bytes of cache values written, before (raw) and after (stored) encoding",
+    ("kind",),
+)
+
+
+class CacheCodecError(ValueError):
+    pass
+
+
+def encode_value(
+    payload: bytes,
+    min_size: int | None = None,
+    level: int | None = None,
+) -> bytes:
+    """
+    Prefixes the payload with its format byte, zlib-compressing it first
+    when it is at least `min_size` bytes and compression pays off.
+    """
+    if min_size is None:
+        min_size = settings.redis.compress_min_bytes
+    if level is None:
+        level = settings.redis.compress_level
+    value = RAW + payload
+    if len(payload) >= min_size:
+        compressed = ZLIB + zlib.compress(payload, level)
+        if len(compressed) < len(value):
+            value = compressed
+    cache_value_bytes_total.inc(len(payload), labels=("raw",))
+    cache_value_bytes_total.inc(len(value), labels=("stored",))
+    return value
+
+
+def decode_value(value: bytes) -> bytes:
+    header, payload = value[:1], value[1:]
+    if header == RAW:
+        return payload
+    if header == ZLIB:
+        try:
+            return zlib.decompress(payload)
+        except zlib.error as error:
+            raise CacheCodecError(f"Corrupt compressed cache value: {error}") from None
+    if header in (b"[", b"{"):
+        # Plain JSON, written before values had a format byte
+        return value
+    raise CacheCodecError(f"Unknown cache value format {header!r}")
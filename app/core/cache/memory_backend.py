@@ -0,0 +1,270 @@
+import asyncio
+from collections import OrderedDict, defaultdict
+from fnmatch import fnmatchcase
+from time import monotonic
+from typing import Any, AsyncIterator
+
+
+def _encode(value: bytes | str | int | float) -> bytes:
+    # What Redis stores, and returns without decode_responses
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class SortedSet(dict[bytes, float]):
+    """Member -> score; ordered on read, the sets here are small."""
+
+    def ordered(self) -> list[bytes]:
+        return sorted(self, key=lambda member: (self[member], member))
+
+
+def _range(items: list, start: int, end: int) -> list:
+    # Redis ranges are inclusive and accept negative indexes
+    size = len(items)
+    if start < 0:
+        start += size
+    if end < 0:
+        end += size
+    if end < 0:
+        return []
+    return items[max(start, 0) : end + 1]
+
+
+class MemoryPubSub:
+    def __init__(self, cache: "MemoryCache"):
+        self.cache = cache
+        self.channels: set[str] = set()
+        self.messages: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    async def __aenter__(self) -> "MemoryPubSub":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self.channels.add(channel)
+            self.cache.subscribers[channel].add(self)
+            self.messages.put_nowait(
+                {"type": "subscribe", "channel": channel, "data": len(self.channels)}
+            )
+
+    async def get_message(
+        self,
+        ignore_subscribe_messages: bool = False,
+        timeout: float | None = 0.0,
+    ) -> dict[str, Any] | None:
+        while True:
+            try:
+                async with asyncio.timeout(timeout):
+                    message = await self.messages.get()
+            except TimeoutError:
+                return None
+            if message["type"] == "message" or not ignore_subscribe_messages:
+                return message
+
+    async def aclose(self) -> None:
+        for channel in self.channels:
+            self.cache.subscribers[channel].discard(self)
+        self.channels.clear()
+
+
+class MemoryPipeline:
+    """
+    Commands run back to back on `execute`. None of them awaits anything,
+    so no other task sees the cache in between, like MULTI/EXEC.
+    """
+
+    def __init__(self, cache: "MemoryCache"):
+        self.cache = cache
+        self.commands: list[tuple[Any, tuple, dict]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.commands.clear()
+
+    def __getattr__(self, name: str) -> Any:
+        command = getattr(self.cache, name)
+
+        def queue(*args, **kwargs) -> "MemoryPipeline":
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list[Any]:
+        commands, self.commands = self.commands, []
+        return [await command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class MemoryCache:
+    """
+    In-process implementation of `CacheBackend` for single-node
+    deployments and tests. Every worker has its own data, pub/sub
+    messages only reach subscribers of the same worker. Expired keys are
+    dropped when read, the least recently used ones past `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.data: OrderedDict[str, Any] = OrderedDict()
+        self.expires: dict[str, float] = {}
+        self.subscribers: defaultdict[str, set[MemoryPubSub]] = defaultdict(set)
+
+    def _read(self, name: str) -> Any:
+        expires = self.expires.get(name)
+        if expires is not None and expires <= monotonic():
+            self._drop(name)
+            return None
+        value = self.data.get(name)
+        if value is not None:
+            self.data.move_to_end(name)
+        return value
+
+    def _write(self, name: str, value: Any) -> None:
+        self.data[name] = value
+        self.data.move_to_end(name)
+        while len(self.data) > self.max_keys:
+            self._drop(next(iter(self.data)))
+
+    def _drop(self, name: str) -> bool:
+        self.expires.pop(name, None)
+        return self.data.pop(name, None) is not None
+
+    def _container(self, name: str, kind: type) -> Any:
+        value = self._read(name)
+        if value is None:
+            value = kind()
+            self._write(name, value)
+        return value
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        return None
+
+    async def get(self, name: str) -> bytes | None:
+        return self._read(name)
+
+    async def mget(self, keys: str | list[str], *args: str) -> list[bytes | None]:
+        names = [keys, *args] if isinstance(keys, str) else [*keys, *args]
+        return [self._read(name) for name in names]
+
+    async def set(
+        self,
+        name: str,
+        value: bytes | str | int,
+        ex: int | None = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> bool | None:
+        exists = self._read(name) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._write(name, _encode(value))
+        if ex is None:
+            self.expires.pop(name, None)
+        else:
+            self.expires[name] = monotonic() + ex
+        return True
+
+    async def delete(self, *names: str) -> int:
+        return sum(self._drop(name) for name in names)
+
+    async def exists(self, *names: str) -> int:
+        return sum(self._read(name) is not None for name in names)
+
+    async def expire(self, name: str, time: int, nx: bool = False) -> bool:
+        if self._read(name) is None or (nx and name in self.expires):
+            return False
+        self.expires[name] = monotonic() + time
+        return True
+
+    async def pttl(self, name: str) -> int:
+        # Like Redis: -2 for a missing key, -1 for one without expiry
+        if self._read(name) is None:
+            return -2
+        expires = self.expires.get(name)
+        if expires is None:
+            return -1
+        return max(int((expires - monotonic()) * 1000), 0)
+
+    async def incr(self, name: str, amount: int = 1) -> int:
+        value = int(self._read(name) or 0) + amount
+        self._write(name, _encode(value))
+        return value
+
+    async def hget(self, name: str, key: str) -> bytes | None:
+        fields = self._read(name)
+        return None if fields is None else fields.get(_encode(key))
+
+    async def hset(
+        self,
+        name: str,
+        key: str | None = None,
+        value: bytes | str | None = None,
+        mapping: dict[str, bytes | str] | None = None,
+    ) -> int:
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        items = {_encode(field): _encode(item) for field, item in items.items()}
+        fields = self._container(name, dict)
+        added = sum(field not in fields for field in items)
+        fields.update(items)
+        return added
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> int:
+        mapping = {_encode(member): score for member, score in mapping.items()}
+        members = self._container(name, SortedSet)
+        added = sum(member not in members for member in mapping)
+        members.update(mapping)
+        return added
+
+    async def zrem(self, name: str, *values: str) -> int:
+        members = self._read(name)
+        if members is None:
+            return 0
+        removed = sum(members.pop(_encode(value), None) is not None for value in values)
+        if not members:
+            self._drop(name)
+        return removed
+
+    async def zremrangebyrank(self, name: str, min: int, max: int) -> int:
+        members = self._read(name)
+        if members is None:
+            return 0
+        return await self.zrem(name, *_range(members.ordered(), min, max))
+
+    async def zrevrange(self, name: str, start: int, end: int) -> list[bytes]:
+        members = self._read(name)
+        if members is None:
+            return []
+        return _range(members.ordered()[::-1], start, end)
+
+    async def scan_iter(self, match: str | None = None) -> AsyncIterator[str]:
+        for name in list(self.data):
+            if match is not None and not fnmatchcase(name, match):
+                continue
+            if self._read(name) is not None:
+                yield name
+
+    async def publish(self, channel: str, message: str | bytes) -> int:
+        message = _encode(message)
+        subscribers = self.subscribers.get(channel, ())
+        for subscriber in subscribers:
+            subscriber.messages.put_nowait(
+                {"type": "message", "channel": channel, "data": message}
+            )
+        return len(subscribers)
+
+    def pubsub(self) -> MemoryPubSub:
+        return MemoryPubSub(self)
+
+    def pipeline(self, transaction: bool = True) -> MemoryPipeline:
+        return MemoryPipeline(self)
@@ -0,0 +1,141 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ResponseError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.config import settings, RedisConfig
+from core.deadline import remaining
+from core.exceptions import GatewayTimeoutError
+from core.metrics import Histogram
+from core.request_cost import record_cache_command
+
+redis_command_duration_seconds = Histogram(
+    "redis_command_duration_seconds",
+    "Redis command latency",
+    ("command",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1.0),
+)
+
+
+class CacheCircuitOpenError(RedisConnectionError):
+    """Raised instead of calling Redis while the circuit is open."""
+
+
+async def run_command(
+    breaker: CircuitBreaker | None,
+    name: str,
+    call: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Runs a command (or a whole pipeline) within the request deadline,
+    capped at `settings.deadlines.redis_command`, and reports the outcome
+    to the circuit breaker. Running out of the request's own deadline
+    is not held against Redis: a few slow requests must not open the
+    circuit for everyone.
+    """
+    timeout = settings.deadlines.redis_command
+    left = remaining()
+    request_bound = left is not None and left < timeout
+    if request_bound:
+        timeout = left
+    if timeout <= 0:
+        raise GatewayTimeoutError()
+    if breaker is not None:
+        try:
+            breaker.before_call()
+        except CircuitOpenError as error:
+            raise CacheCircuitOpenError(str(error)) from None
+    answered = abandoned = False
+    started = perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            result = await call()
+        answered = True
+        return result
+    except ResponseError:
+        # An error reply still means Redis is up
+        answered = True
+        raise
+    except TimeoutError:
+        if request_bound:
+            abandoned = True
+            raise GatewayTimeoutError() from None
+        raise RedisTimeoutError(f"{name} took over {timeout}s") from None
+    finally:
+        elapsed = perf_counter() - started
+        record_cache_command(elapsed)
+        redis_command_duration_seconds.observe(elapsed, (name,))
+        if breaker is not None:
+            if answered:
+                breaker.record_success(elapsed)
+            elif abandoned:
+                breaker.record_abandoned()
+            else:
+                breaker.record_failure()
+
+
+class TimedPipeline(Pipeline):
+    breaker: CircuitBreaker | None = None
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        return await run_command(
+            self.breaker,
+            "PIPELINE",
+            lambda: super(TimedPipeline, self).execute(raise_on_error),
+        )
+
+
+class TimedRedis(redis.Redis):
+    def __init__(self, *args, breaker: CircuitBreaker | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    async def execute_command(self, *args, **options):
+        return await run_command(
+            self.breaker,
+            str(args[0]),
+            lambda: super(TimedRedis, self).execute_command(*args, **options),
+        )
+
+    def pipeline(
+        self,
+        transaction: bool = True,
+        shard_hint: str | None = None,
+    ) -> TimedPipeline:
+        pipeline = TimedPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+        )
+        pipeline.breaker = self.breaker
+        return pipeline
+
+
+def create_redis_client(config: RedisConfig) -> TimedRedis:
+    pool = redis.BlockingConnectionPool(
+        host=config.host,
+        port=config.port,
+        # Cached pages are binary, see codec.py
+        decode_responses=False,
+        max_connections=config.max_connections,
+        # Waiting for a free connection, not for Redis itself
+        timeout=config.pool_timeout,
+        socket_timeout=config.socket_timeout,
+        socket_connect_timeout=config.socket_connect_timeout,
+        socket_keepalive=True,
+        health_check_interval=config.health_check_interval,
+    )
+    breaker = CircuitBreaker(
+        name="redis",
+        failure_threshold=config.circuit_breaker.failure_threshold,
+        slow_call_seconds=config.circuit_breaker.slow_call_ms / 1000,
+        reset_timeout=config.circuit_breaker.reset_timeout,
+    )
+    return TimedRedis(connection_pool=pool, breaker=breaker)
@@ -0,0 +1,39 @@
+"""
+List pages are cached as aligned windows of rows, so overlapping
+limit/offset combinations share entries. A packed window is a JSON list
+of where each row starts, a newline, then the rows joined by commas,
+which lets pages be cut out of it without parsing the rows.
+"""
+
+import orjson
+
+
+def window_range(offset: int, limit: int, size: int) -> range:
+    """Indexes of the windows of `size` rows covering the page."""
+    return range(offset // size, (offset + limit - 1) // size + 1)
+
+
+def pack_window(rows: list[bytes]) -> bytes:
+    starts = [0]
+    for row in rows:
+        # One comma after every row
+        starts.append(starts[-1] + len(row) + 1)
+    return orjson.dumps(starts) + b"\n" + b",".join(rows)
+
+
+def slice_window(window: bytes, start: int, stop: int) -> bytes:
+    """Rows start..stop of the window, joined by commas."""
+    index, _, body = window.partition(b"\n")
+    starts = orjson.loads(index)
+    count = len(starts) - 1
+    start, stop = max(start, 0), min(stop, count)
+    if start >= stop:
+        return b""
+    return body[starts[start] : starts[stop] - 1]
+
+
+def normalize_search(search: str | None) -> str | None:
+    # Matching is case-insensitive (ILIKE), whitespace runs are collapsed
+    if search is None:
+        return None
+    return " ".join(search.lower().split()) or None
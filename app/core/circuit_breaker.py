@@ -0,0 +1,91 @@
+from time import monotonic
+
+from core.logger import logger
+from core.metrics import Counter, Gauge
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_state = Gauge(
+    "circuit_breaker_state",
+    "0 closed, 1 half-open (probing), 2 open (calls skipped)",
+    ("circuit",),
+)
+circuit_trips_total = Counter(
+    "circuit_breaker_trips_total",
+    "Times the circuit opened",
+    ("circuit",),
+)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls; a call
+    slower than `slow_call_seconds` counts as failed too. While open,
+    calls are refused without waiting on the dependency. After
+    `reset_timeout` seconds a single probe call is let through:
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 0.1,
+        reset_timeout: float = 5.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        circuit_state.set(STATE_VALUES[CLOSED], labels=(name,))
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        circuit_state.set(STATE_VALUES[state], labels=(self.name,))
+
+    def before_call(self) -> None:
+        """
+        Raises CircuitOpenError if the call must be skipped.
+        """
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN and monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+            return
+        raise CircuitOpenError(f"Circuit {self.name} is {self.state}")
+
+    def record_success(self, elapsed: float) -> None:
+        if elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+        self.failures = 0
+        self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                circuit_trips_total.inc(labels=(self.name,))
+            self.opened_at = monotonic()
+            self._set_state(OPEN)
+
+    def record_abandoned(self) -> None:
+        """
+        The call was cut short by its caller (the request's own deadline
+        ran out), which says nothing about the dependency. A probe
+        abandoned this way lets the next call probe instead.
+        """
+        if self.state == HALF_OPEN:
+            self._set_state(OPEN)
+            self.opened_at = monotonic() - self.reset_timeout
@@ -1,10 +1,21 @@
-from pydantic import BaseModel, PostgresDsn
+from typing import Literal
+
+from pydantic import BaseModel, PositiveFloat, PositiveInt, PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class RunConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
+    # production server (serve.py), workers default to the number of CPUs
+    workers: int | None = None
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    timeout_keep_alive: int = 5
+    backlog: int = 2048
+    timeout_graceful_shutdown: int = 30
+    # restart a worker after this many requests to cap memory growth
+    limit_max_requests: int | None = None
 
 
 class ApiV1Prefix(BaseModel):
@@ -13,6 +24,7 @@ class ApiV1Prefix(BaseModel):
     users: str = "/users"
     messages: str = "/messages"
     posts: str = "/posts"
+    internal: str = "/internal"
 
 
 class ApiPrefix(BaseModel):
@@ -27,12 +39,45 @@ class ApiPrefix(BaseModel):
         return path.removeprefix("/")
 
 
+class WriteBatchingConfig(BaseModel):
+    # group commit for POST /posts, off by default
+    enabled: bool = False
+    max_batch_size: int = 100
+    max_delay_ms: float = 5
+
+
+class SyncConfig(BaseModel):
+    # changes younger than this are held back, so rows from transactions
+    # that started earlier but commit later are not skipped by a cursor
+    settle_seconds: float = 2.0
+    max_limit: int = 500
+
+
+class ViewCountsConfig(BaseModel):
+    # views are counted in memory and added to posts.view_count in batches;
+    # a crash loses at most one interval (or max_pending posts) of views
+    flush_interval: float = 5.0
+    max_pending: int = 10_000
+    batch_size: int = 1_000
+    # while flushes fail: retries back off up to max_backoff seconds,
+    # views of posts beyond max_tracked pending ones are dropped
+    max_tracked: int = 100_000
+    max_backoff: float = 60.0
+
+
 class DatabaseConfig(BaseModel):
     url: PostgresDsn
     echo: bool = False
     echo_pool: bool = False
     max_overflow: int = 50
     pool_size: int = 10
+    # connections opened at startup so the first requests skip the connect
+    pool_prewarm: int = 0
+    # statements slower than this are logged with their EXPLAIN plan
+    slow_query_threshold_ms: float | None = None
+    slow_query_log_size: int = 100
+    write_batching: WriteBatchingConfig = WriteBatchingConfig()
+    view_counts: ViewCountsConfig = ViewCountsConfig()
 
     naming_conventions: dict[str, str] = {
         "ix": "ix_%(column_0_label)s",
@@ -42,15 +87,141 @@ class DatabaseConfig(BaseModel):
         "pk": "pk_%(table_name)s",
     }
 
+
 class AccessToken(BaseModel):
     lifetime_seconds: int = 3600
     reset_password_token_secret: str
     verification_token_secret: str
 
+
+class CircuitBreakerConfig(BaseModel):
+    # consecutive failed (or slower than slow_call_ms) commands to open
+    failure_threshold: int = 5
+    slow_call_ms: float = 100
+    # seconds before a probe command is let through again
+    reset_timeout: float = 5.0
+
+
 class RedisConfig(BaseModel):
+    # "memory" keeps the cache in each worker's process, no Redis needed
+    backend: Literal["redis", "memory"] = "redis"
     host: str = "localhost"
     port: int = 6379
     ex: int = 60
+    # connections per worker; when all are busy a command waits pool_timeout
+    max_connections: int = 50
+    pool_timeout: float = 0.1
+    socket_timeout: float = 0.5
+    socket_connect_timeout: float = 0.5
+    # seconds idle before a connection is PINGed on checkout
+    health_check_interval: int = 30
+    circuit_breaker: CircuitBreakerConfig = CircuitBreakerConfig()
+    # least recently used keys of the memory backend are evicted past this
+    memory_max_keys: int = 100_000
+    # cached pages at least this large are stored zlib-compressed
+    compress_min_bytes: int = 1024
+    compress_level: int = 1
+
+
+class RateLimitRule(BaseModel):
+    # token bucket: bursts of `capacity`, `refill_per_second` sustained
+    # the script divides by refill_per_second
+    capacity: PositiveInt
+    refill_per_second: PositiveFloat
+
+
+class RateLimitConfig(BaseModel):
+    enabled: bool = True
+    rules: dict[str, RateLimitRule] = {
+        "posts_search": RateLimitRule(capacity=20, refill_per_second=5),
+        "posts_write": RateLimitRule(capacity=10, refill_per_second=1),
+    }
+    # buckets kept per worker while Redis is unreachable
+    fallback_max_keys: int = 10_000
+
+
+class ConcurrencyClass(BaseModel):
+    # requests of the class running at once in one worker
+    limit: int
+    # queued longer than this (or expected to be) -> 503
+    max_wait_ms: float
+
+
+class LoadSheddingConfig(BaseModel):
+    enabled: bool = True
+    classes: dict[str, ConcurrencyClass] = {
+        "cached_read": ConcurrencyClass(limit=200, max_wait_ms=50),
+        # below pool_size + max_overflow, so DB work never queues in the pool
+        "db_read": ConcurrencyClass(limit=40, max_wait_ms=500),
+        "write": ConcurrencyClass(limit=15, max_wait_ms=1000),
+        # password hashing is CPU bound
+        "auth": ConcurrencyClass(limit=4, max_wait_ms=1000),
+    }
+
+
+class DeadlinesConfig(BaseModel):
+    # seconds an API request may spend; database statements and Redis
+    # commands are cut off once it is used up
+    default: float = 10.0
+    routes: dict[str, float] = {
+        "posts_list": 3.0,
+        "post_changes": 5.0,
+        "author_posts": 3.0,
+    }
+    # cap on a single Redis command, the request deadline may shorten it
+    redis_command: float = 0.5
+
+
+class LatestPostsConfig(BaseModel):
+    # newest posts kept in Redis, globally and per category
+    size: int = 200
+    post_ttl: int = 7 * 86400
+    # build the feed when Redis does not have it: at startup, after it
+    # expired (post_ttl) or a post of it did; checked every rebuild_interval
+    rebuild_on_startup: bool = True
+    rebuild_interval: float = 60.0
+
+
+class PostsCacheConfig(BaseModel):
+    # post lists are cached in aligned windows of this many rows
+    window: int = 100
+    # a window older than redis.ex is stale: it is still served for
+    # stale_ex more seconds while one request refreshes it in the background
+    stale_ex: int = 60
+    refresh_lock_ex: int = 30
+    # the most requested windows are refreshed before they go stale
+    warm_top: int = 50
+    warm_interval: float = 10.0
+    sketch_width: int = 4096
+    sketch_depth: int = 4
+
+
+class SuggestConfig(BaseModel):
+    # titles and category names kept in each worker's prefix index
+    max_entries: int = 200_000
+    # prefixes up to this long keep their keys ranked instead of scanned
+    ranked_prefix_length: int = 2
+    channel: str = "suggest_index"
+
+
+class LoggingConfig(BaseModel):
+    level: str = "INFO"
+    format: Literal["json", "text"] = "json"
+    # per-logger overrides, e.g. {"sqlalchemy.engine": "WARNING"}
+    levels: dict[str, str] = {}
+    # keep one of every N records for noisy message templates
+    sample_every: dict[str, int] = {}
+    queue_size: int = 10_000
+
+
+class MetricsConfig(BaseModel):
+    path: str = "/metrics"
+    # per-worker snapshot files, required when running several workers
+    multiprocess_dir: str | None = None
+    flush_interval: float = 5.0
+    # snapshots not rewritten for this many flush intervals belong to
+    # dead workers and are folded into dead.json
+    stale_intervals: int = 3
 
 
 class Settings(BaseSettings):
@@ -65,6 +236,15 @@ class Settings(BaseSettings):
     db: DatabaseConfig
     access_token: AccessToken
     redis: RedisConfig = RedisConfig()
+    latest_posts: LatestPostsConfig = LatestPostsConfig()
+    posts_cache: PostsCacheConfig = PostsCacheConfig()
+    suggest: SuggestConfig = SuggestConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
+    load_shedding: LoadSheddingConfig = LoadSheddingConfig()
+    deadlines: DeadlinesConfig = DeadlinesConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    logging: LoggingConfig = LoggingConfig()
+    sync: SyncConfig = SyncConfig()
 
 
 settings = Settings()
@@ -26,4 +26,20 @@ COMMON_RESPONSES = {
             }
         },
     },
+    status.HTTP_429_TOO_MANY_REQUESTS: {
+        "description": "Rate limit exceeded, retry after `Retry-After` seconds",
+        "content": {
+            "application/json": {
+                "example": {"detail": "Too many requests"}
+            }
+        },
+    },
+    status.HTTP_503_SERVICE_UNAVAILABLE: {
+        "description": "Server is overloaded, retry after `Retry-After` seconds",
+        "content": {
+            "application/json": {
+                "example": {"detail": "Server is overloaded"}
+            }
+        },
+    },
 }
\ No newline at end of file
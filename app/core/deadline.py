@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Iterator
+
+# monotonic() time by which the current request has to be done
+request_deadline: ContextVar[float | None] = ContextVar(
+    "request_deadline",
+    default=None,
+)
+
+
+def remaining() -> float | None:
+    """
+    Seconds left until the deadline, None outside of a request.
+    """
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - monotonic()
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    token = request_deadline.set(monotonic() + seconds)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
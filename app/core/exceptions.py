@@ -1,3 +1,5 @@
+import math
+
 from fastapi import HTTPException, status
 
 
@@ -12,3 +14,23 @@ class UnauthorizedError(HTTPException):
 class ForbiddenError(HTTPException):
     def __init__(self, detail: str = "You cannot change this post."):
         super().__init__(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+class TooManyRequestsError(HTTPException):
+    def __init__(self, retry_after: float, detail: str = "Too many requests"):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+class ServiceUnavailableError(HTTPException):
+    def __init__(self, retry_after: float, detail: str = "Server is overloaded"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+class GatewayTimeoutError(HTTPException):
+    def __init__(self, detail: str = "Request deadline exceeded"):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=detail)
@@ -0,0 +1,73 @@
+from typing import Hashable
+
+
+class FrequencySketch:
+    """
+    Count-min sketch of how often keys are requested, in `depth` rows of
+    `width` counters. Every `sample_size` additions all counts are halved
+    (as in TinyLFU), so keys that stopped being requested fade out.
+    The `top` keys with the highest estimates are remembered for
+    `most_common`.
+    """
+
+    def __init__(
+        self,
+        width: int = 4096,
+        depth: int = 4,
+        top: int = 50,
+        sample_size: int | None = None,
+    ):
+        self.width = width
+        self.depth = depth
+        self.top = top
+        self.sample_size = sample_size or width * 10
+        self.rows = [[0] * width for _ in range(depth)]
+        self.additions = 0
+        # key -> estimate, up to twice `top` keys so ranks can shift
+        self.candidates: dict[Hashable, int] = {}
+
+    def _indexes(self, key: Hashable) -> list[int]:
+        # Double hashing: row i uses h1 + i * h2
+        value = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def add(self, key: Hashable) -> int:
+        indexes = self._indexes(key)
+        estimate = 1 + min(row[index] for row, index in zip(self.rows, indexes))
+        # Conservative update: only raise the counters that are behind
+        for row, index in zip(self.rows, indexes):
+            if row[index] < estimate:
+                row[index] = estimate
+        self._track(key, estimate)
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._halve()
+        return estimate
+
+    def _track(self, key: Hashable, estimate: int) -> None:
+        if key in self.candidates or len(self.candidates) < self.top * 2:
+            self.candidates[key] = estimate
+            return
+        coldest = min(self.candidates, key=self.candidates.__getitem__)
+        if estimate > self.candidates[coldest]:
+            del self.candidates[coldest]
+            self.candidates[key] = estimate
+
+    def _halve(self) -> None:
+        for row in self.rows:
+            for index, count in enumerate(row):
+                row[index] = count >> 1
+        self.candidates = {
+            key: estimate >> 1
+            for key, estimate in self.candidates.items()
+            if estimate > 1
+        }
+        self.additions = 0
+
+    def most_common(self, count: int | None = None) -> list[Hashable]:
+        ranked = sorted(self.candidates, key=self.candidates.__getitem__, reverse=True)
+        return ranked[: self.top if count is None else count]
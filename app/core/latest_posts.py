@@ -0,0 +1,202 @@
+import asyncio
+from datetime import datetime, timezone
+
+from core.cache import CacheBackend, cache_client
+from core.config import settings
+from core.schemas.post import PostRead
+
+FEED_KEY = "latest_posts"
+CATEGORY_FEED_PREFIX = "latest_posts:category:"
+READY_KEY = "latest_posts:ready"
+REBUILD_LOCK_KEY = "latest_posts:rebuild_lock"
+POST_KEY_PREFIX = "post:"
+# Members sort by (score, member); storing ids inverted makes ZREVRANGE
+# break created_at ties by ascending id, like the database does
+MAX_MEMBER = 10**15
+
+
+def post_key(post_id: int) -> str:
+    return f"{POST_KEY_PREFIX}{post_id}"
+
+
+def category_feed_key(category: str) -> str:
+    return f"{CATEGORY_FEED_PREFIX}{category}"
+
+
+def to_member(post_id: int) -> str:
+    return f"{MAX_MEMBER - post_id:015d}"
+
+
+def to_post_id(member: bytes) -> int:
+    return MAX_MEMBER - int(member)
+
+
+def to_score(created_at: datetime) -> int:
+    # Microseconds stay exact in a double until year 2255
+    created_at = created_at.replace(tzinfo=timezone.utc)
+    return int(created_at.timestamp()) * 1_000_000 + created_at.microsecond
+
+
+class LatestPosts:
+    """
+    Newest `size` posts, globally and per category, kept in Redis sorted
+    sets (score = created_at) next to the serialized posts, so the first
+    pages of `order=created_at` need no database round trip.
+
+    Every feed holds the top of its ordering without gaps; whenever that
+    cannot be guaranteed the feed, or the post, is dropped and readers
+    fall back to the database until `replace` rebuilds it.
+    """
+
+    def __init__(
+        self,
+        client: CacheBackend,
+        size: int = 200,
+        post_ttl: int = 7 * 86400,
+    ):
+        self.client = client
+        self.size = size
+        self.post_ttl = post_ttl
+        # Set when a reader finds the feed missing or with a gap,
+        # wakes up keep_latest_posts_ready
+        self.rebuild_needed = asyncio.Event()
+        # A write could not be applied to the feeds, see mark_dirty
+        self.dirty = False
+
+    async def is_ready(self) -> bool:
+        return bool(await self.client.exists(READY_KEY))
+
+    def mark_dirty(self) -> None:
+        """
+        Records that a write missed the feeds (Redis failed), so they
+        are dropped and rebuilt once Redis answers again.
+        """
+        self.dirty = True
+        self.rebuild_needed.set()
+
+    async def drop_if_dirty(self) -> None:
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            await self.client.delete(READY_KEY)
+        except Exception:
+            self.dirty = True
+            raise
+
+    async def get_page(
+        self,
+        limit: int,
+        offset: int = 0,
+        category: str | None = None,
+    ) -> bytes | None:
+        """
+        The page as a JSON array, or None when it must come from the database:
+        the feed is not built, does not reach that far, or a post expired.
+        """
+        if offset + limit > self.size:
+            return None
+        key = FEED_KEY if category is None else category_feed_key(category)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.exists(READY_KEY)
+            pipe.zrevrange(key, offset, offset + limit - 1)
+            ready, members = await pipe.execute()
+        if not ready:
+            self.rebuild_needed.set()
+            return None
+        # A short page may just mean the rest was trimmed or never loaded
+        if len(members) < limit:
+            return None
+        posts = await self.client.mget(
+            [post_key(to_post_id(member)) for member in members]
+        )
+        if None in posts:
+            # A post expired, the feed has a gap until it is rebuilt
+            await self.client.delete(READY_KEY)
+            self.rebuild_needed.set()
+            return None
+        return b"[" + b",".join(posts) + b"]"
+
+    async def add(self, post: PostRead) -> None:
+        # A new post is the newest one, so it extends the top of both feeds
+        member = to_member(post.id)
+        score = to_score(post.created_at)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(post_key(post.id), post.model_dump_json(), ex=self.post_ttl)
+            for key in (FEED_KEY, category_feed_key(post.category)):
+                pipe.zadd(key, {member: score})
+                pipe.zremrangebyrank(key, 0, -self.size - 1)
+            await pipe.execute()
+
+    async def update(self, post: PostRead) -> None:
+        cached = await self.client.get(post_key(post.id))
+        if cached is None:
+            # Not in any feed, or expired: readers already skip it
+            return
+        previous_category = PostRead.model_validate_json(cached).category
+        async with self.client.pipeline(transaction=True) as pipe:
+            if previous_category != post.category:
+                pipe.zrem(category_feed_key(previous_category), to_member(post.id))
+                # Where an older post lands in the other feed is unknown
+                pipe.delete(category_feed_key(post.category))
+            pipe.set(
+                post_key(post.id),
+                post.model_dump_json(),
+                ex=self.post_ttl,
+                xx=True,
+            )
+            await pipe.execute()
+
+    async def remove(self, post_id: int) -> None:
+        cached = await self.client.get(post_key(post_id))
+        member = to_member(post_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(FEED_KEY, member)
+            if cached is not None:
+                category = PostRead.model_validate_json(cached).category
+                pipe.zrem(category_feed_key(category), member)
+            pipe.delete(post_key(post_id))
+            await pipe.execute()
+
+    async def replace(
+        self,
+        posts: list[PostRead],
+        posts_by_category: dict[str, list[PostRead]],
+    ) -> None:
+        feeds = {FEED_KEY: posts} | {
+            category_feed_key(category): category_posts
+            for category, category_posts in posts_by_category.items()
+        }
+        stored = {post.id: post for feed in feeds.values() for post in feed}
+        stale_keys = [
+            key async for key in self.client.scan_iter(f"{CATEGORY_FEED_PREFIX}*")
+        ]
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(FEED_KEY, *stale_keys)
+            for post in stored.values():
+                pipe.set(post_key(post.id), post.model_dump_json(), ex=self.post_ttl)
+            for key, feed in feeds.items():
+                if feed:
+                    pipe.zadd(
+                        key,
+                        {
+                            to_member(post.id): to_score(post.created_at)
+                            for post in feed
+                        },
+                    )
+            # The posts stored here expire together with the flag
+            pipe.set(READY_KEY, 1, ex=self.post_ttl)
+            await pipe.execute()
+
+    async def acquire_rebuild_lock(self, timeout: int = 300) -> bool:
+        return bool(await self.client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=timeout))
+
+    async def release_rebuild_lock(self) -> None:
+        await self.client.delete(REBUILD_LOCK_KEY)
+
+
+latest_posts = LatestPosts(
+    client=cache_client,
+    size=settings.latest_posts.size,
+    post_ttl=settings.latest_posts.post_ttl,
+)
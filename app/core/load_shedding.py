@@ -0,0 +1,108 @@
+import asyncio
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator
+
+from core.config import settings, ConcurrencyClass
+from core.exceptions import ServiceUnavailableError
+from core.metrics import Counter, Gauge, Histogram
+
+in_flight = Gauge(
+    "concurrency_in_flight",
+    "Requests of the class currently running",
+    ("class",),
+)
+queue_depth = Gauge(
+    "concurrency_queue_depth",
+    "Requests of the class waiting for a slot",
+    ("class",),
+)
+queue_wait_seconds = Histogram(
+    "concurrency_queue_wait_seconds",
+    "Time requests of the class waited for a slot",
+    ("class",),
+)
+shed_total = Counter(
+    "requests_shed_total",
+    "Requests rejected with 503 before running, by class and reason",
+    ("class", "reason"),
+)
+
+
+class ConcurrencyLimiter:
+    """
+    Lets at most `limit` requests of a class run at once in this worker
+    and queues the rest in FIFO order. A request is shed with a 503 when
+    the expected wait (queue depth / limit * average service time)
+    already exceeds `max_wait`, or when it has waited that long.
+    """
+
+    def __init__(self, name: str, limit: int, max_wait_ms: float):
+        self.name = name
+        self.limit = limit
+        self.max_wait = max_wait_ms / 1000
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        # Exponentially weighted moving average of the time a slot is held
+        self.service_time = 0.0
+
+    def expected_wait(self) -> float:
+        return (self.waiting + 1) / self.limit * self.service_time
+
+    def _shed(self, reason: str, retry_after: float) -> ServiceUnavailableError:
+        shed_total.inc(labels=(self.name, reason))
+        return ServiceUnavailableError(retry_after=retry_after)
+
+    async def _acquire(self) -> None:
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            return
+        if self.expected_wait() > self.max_wait:
+            raise self._shed("expected_wait", self.expected_wait())
+        self.waiting += 1
+        queue_depth.inc(labels=(self.name,))
+        started = perf_counter()
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await self.semaphore.acquire()
+        except TimeoutError:
+            raise self._shed("timeout", self.expected_wait()) from None
+        finally:
+            self.waiting -= 1
+            queue_depth.dec(labels=(self.name,))
+            queue_wait_seconds.observe(perf_counter() - started, labels=(self.name,))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        in_flight.inc(labels=(self.name,))
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            self.service_time += (elapsed - self.service_time) * 0.1
+            in_flight.dec(labels=(self.name,))
+            self.semaphore.release()
+
+
+def build_limiters(
+    classes: dict[str, ConcurrencyClass],
+) -> dict[str, ConcurrencyLimiter]:
+    return {
+        name: ConcurrencyLimiter(name, budget.limit, budget.max_wait_ms)
+        for name, budget in classes.items()
+    }
+
+
+limiters = build_limiters(settings.load_shedding.classes)
+
+
+@asynccontextmanager
+async def concurrency_slot(class_name: str) -> AsyncIterator[None]:
+    limiter = limiters.get(class_name)
+    if not settings.load_shedding.enabled or limiter is None:
+        yield
+        return
+    async with limiter.slot():
+        yield
@@ -1,10 +1,107 @@
+import atexit
 import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from core.config import settings
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one of every N records per message template,
+    e.g. {"Get posts with params: ...": 100}.
+    """
+
+    def __init__(self, sample_every: dict[str, int]):
+        super().__init__()
+        self.sample_every = sample_every
+        self.seen: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = self.sample_every.get(record.msg)
+        if not every or every <= 1:
+            return True
+        seen = self.seen.get(record.msg, 0)
+        self.seen[record.msg] = seen + 1
+        return seen % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS:
+                payload[key] = value
+        return orjson.dumps(payload, default=str).decode()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records over to the listener thread. When the queue is full
+    the record is dropped instead of blocking the event loop.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def build_formatter(fmt: str) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        "[%(asctime)s] %(levelname)s in %(module)s [%(request_id)s]: %(message)s"
+    )
+
+
+log_queue: queue.Queue = queue.Queue(maxsize=settings.logging.queue_size)
+
+stream_handler = logging.StreamHandler(sys.stderr)
+stream_handler.setFormatter(build_formatter(settings.logging.format))
+
+queue_handler = DroppingQueueHandler(log_queue)
+queue_handler.addFilter(RequestIdFilter())
+queue_handler.addFilter(SamplingFilter(settings.logging.sample_every))
+
+listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
 
 logger = logging.getLogger("blogging-platform-api")
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter("[%(asctime)s] %(levelname)s in %(module)s: %(message)s")
+logger.setLevel(settings.logging.level)
+logger.addHandler(queue_handler)
+logger.propagate = False
 
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(formatter)
-logger.addHandler(ch)
+for name, level in settings.logging.levels.items():
+    logging.getLogger(name).setLevel(level)
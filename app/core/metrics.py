@@ -0,0 +1,361 @@
+import asyncio
+import fcntl
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable
+
+import orjson
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+class Metric:
+    type: str = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.register(self)
+
+    def snapshot(self) -> dict:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        # Recording happens on the event loop thread only,
+        # so a plain dict update is enough - no locking
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        return {"values": [[list(k), v] for k, v in self.values.items()]}
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        function: Callable[[], float] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[LabelValues, float] = {}
+        self.function = function
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        self.values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def collect(self) -> dict[LabelValues, float]:
+        if self.function is not None:
+            return {(): float(self.function())}
+        return self.values
+
+    def snapshot(self) -> dict:
+        return {"values": [[list(k), v] for k, v in self.collect().items()]}
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values: dict[LabelValues, list] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": list(self.buckets),
+            "values": [
+                [list(k), {"counts": list(v[0]), "sum": v[1], "count": v[2]}]
+                for k, v in self.values.items()
+            ],
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self, prefix: str = "") -> dict[str, dict]:
+        return {
+            name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                **metric.snapshot(),
+            }
+            for name, metric in self.metrics.items()
+            if name.startswith(prefix)
+        }
+
+
+registry = MetricsRegistry()
+
+
+# Multi-process support: every worker periodically dumps its own
+# snapshot to <directory>/<pid>-<token>.json and the worker that serves
+# a scrape merges all of them. Nothing is shared between processes
+# on the hot path. Snapshots of workers that are gone are folded into
+# <directory>/dead.json, so their counters stay part of the totals.
+
+# Tells apart two processes that got the same pid
+PROCESS_TOKEN = f"{time.time_ns():x}"
+DEAD_SNAPSHOT = "dead.json"
+
+
+def write_snapshot(directory: str, snapshot: dict[str, dict] | None = None) -> None:
+    path = Path(directory) / f"{os.getpid()}-{PROCESS_TOKEN}.json"
+    tmp_path = path.with_suffix(".tmp")
+    if snapshot is None:
+        snapshot = registry.snapshot()
+    tmp_path.write_bytes(orjson.dumps(snapshot))
+    tmp_path.replace(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_dead(path: Path, stale_after: float | None) -> bool:
+    pid, _, _ = path.stem.partition("-")
+    if not pid.isdigit() or not _pid_alive(int(pid)):
+        return True
+    # A live pid that stopped writing was reused by another process
+    return stale_after is not None and time.time() - path.stat().st_mtime > stale_after
+
+
+def _load_snapshot(path: Path) -> dict[str, dict] | None:
+    try:
+        return orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def _without_gauges(snapshot: dict[str, dict]) -> dict[str, dict]:
+    # Gauges describe a process that no longer exists
+    return {
+        name: metric
+        for name, metric in snapshot.items()
+        if metric["type"] != Gauge.type
+    }
+
+
+def _to_snapshot(merged: dict[str, dict]) -> dict[str, dict]:
+    return {
+        name: {
+            **metric,
+            "values": [
+                [list(labels), value] for labels, value in metric["values"].items()
+            ],
+        }
+        for name, metric in merged.items()
+    }
+
+
+def fold_dead_snapshots(directory: str, paths: list[Path]) -> None:
+    """
+    Adds the counters and histograms of dead workers to dead.json and
+    removes their files. Workers scraping at the same time take turns.
+    """
+    root = Path(directory)
+    with open(root / "dead.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = [_load_snapshot(root / DEAD_SNAPSHOT) or {}]
+        # Another worker may have folded some of them already
+        paths = [path for path in paths if path.exists()]
+        for path in paths:
+            snapshot = _load_snapshot(path)
+            if snapshot is not None:
+                snapshots.append(_without_gauges(snapshot))
+        tmp_path = root / "dead.tmp"
+        tmp_path.write_bytes(orjson.dumps(_to_snapshot(merge_snapshots(snapshots))))
+        tmp_path.replace(root / DEAD_SNAPSHOT)
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+
+def read_snapshots(
+    directory: str,
+    stale_after: float | None = None,
+) -> list[dict[str, dict]]:
+    """
+    Snapshots of the live workers and of the dead ones, folded.
+    A worker is dead when its pid is gone or its file is older than
+    `stale_after` seconds.
+    """
+    root = Path(directory)
+    live, dead = [], []
+    for path in root.glob("*.json"):
+        if path.name == DEAD_SNAPSHOT:
+            continue
+        try:
+            (dead if _is_dead(path, stale_after) else live).append(path)
+        except FileNotFoundError:
+            continue
+    if dead:
+        fold_dead_snapshots(directory, dead)
+    snapshots = [_load_snapshot(path) for path in [root / DEAD_SNAPSHOT, *live]]
+    return [snapshot for snapshot in snapshots if snapshot is not None]
+
+
+def merge_snapshots(snapshots: list[dict[str, dict]]) -> dict[str, dict]:
+    merged: dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            values = target["values"]
+            for labels, value in metric["values"]:
+                key = tuple(labels)
+                if metric["type"] != Histogram.type:
+                    values[key] = values.get(key, 0.0) + value
+                    continue
+                current = values.get(key)
+                if current is None:
+                    values[key] = {**value, "counts": list(value["counts"])}
+                    continue
+                current["counts"] = [
+                    a + b for a, b in zip(current["counts"], value["counts"])
+                ]
+                current["sum"] += value["sum"]
+                current["count"] += value["count"]
+    return merged
+
+
+async def write_snapshots_periodically(directory: str, interval: float) -> None:
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    try:
+        while True:
+            write_snapshot(directory)
+            await asyncio.sleep(interval)
+    finally:
+        write_snapshot(directory)
+
+
+def _collect_directory(
+    directory: str,
+    snapshot: dict[str, dict],
+    stale_after: float | None,
+) -> dict[str, dict]:
+    write_snapshot(directory, snapshot)
+    return merge_snapshots(read_snapshots(directory, stale_after))
+
+
+async def collect(
+    directory: str | None = None,
+    stale_after: float | None = None,
+) -> dict[str, dict]:
+    # The registry is only read on the event loop, which updates it
+    snapshot = registry.snapshot()
+    if directory is None:
+        return merge_snapshots([snapshot])
+    # File locks and snapshot files stay off the event loop
+    return await asyncio.to_thread(_collect_directory, directory, snapshot, stale_after)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: list[str], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def render_prometheus(metrics: dict[str, dict]) -> str:
+    lines = []
+    for name, metric in metrics.items():
+        help_text = metric["help"].replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in metric["values"].items():
+            if metric["type"] != Histogram.type:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+                continue
+            cumulative = 0
+            bounds = [*map(_format_bound, metric["buckets"]), "+Inf"]
+            for bound, count in zip(bounds, value["counts"]):
+                cumulative += count
+                bucket_labels = _format_labels(labelnames, labels, f'le="{bound}"')
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            series_labels = _format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{series_labels} {value['sum']}")
+            lines.append(f"{name}_count{series_labels} {value['count']}")
+    lines.append("")
+    return "\n".join(lines)
@@ -5,6 +5,7 @@ __all__ = [
     "AccessToken",
     "Post",
     "Category",
+    "PostTombstone",
 ]
 
 from .db_helper import db_helper
@@ -13,3 +14,4 @@ from .user import User
 from .access_token import AccessToken
 from .post import Post
 from .category import Category
+from .post_tombstone import PostTombstone
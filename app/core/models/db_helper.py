@@ -1,3 +1,4 @@
+from contextlib import AsyncExitStack
 from typing import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import (
@@ -8,6 +9,14 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from core.config import settings
+from core.request_cost import track_engine_queries
+from .pool_metrics import (
+    InstrumentedAsyncAdaptedQueuePool,
+    instrument_engine,
+    register_pool_gauges,
+)
+from .slow_query_log import SlowQueryLog
+from .statement_timeout import install_statement_timeout
 
 class DataBaseHelper:
     def __init__(
@@ -17,14 +26,27 @@ class DataBaseHelper:
             echo_pool: bool = False,
             max_overflow: int = 5,
             pool_size: int = 10,
+            slow_query_threshold_ms: float | None = None,
+            slow_query_log_size: int = 100,
     ):
+        self.pool_size = pool_size
         self.engine: AsyncEngine = create_async_engine(
             url=url,
             echo=echo,
             echo_pool=echo_pool,
             max_overflow=max_overflow,
             pool_size=pool_size,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
         )
+        instrument_engine(self.engine)
+        track_engine_queries(self.engine)
+        self.slow_query_log: SlowQueryLog | None = None
+        if slow_query_threshold_ms is not None:
+            self.slow_query_log = SlowQueryLog(
+                engine=self.engine,
+                threshold_ms=slow_query_threshold_ms,
+                size=slow_query_log_size,
+            )
         self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
             bind=self.engine,
             autocommit=False,
@@ -35,6 +57,13 @@ class DataBaseHelper:
     async def dispose(self):
         await self.engine.dispose()
 
+    async def prewarm(self, connections: int) -> None:
+        # Connections above pool_size are overflow and get closed
+        # on checkin, so there is no point in opening more of them
+        async with AsyncExitStack() as stack:
+            for _ in range(min(connections, self.pool_size)):
+                await stack.enter_async_context(self.engine.connect())
+
     async def session_getter(self) -> AsyncGenerator[AsyncSession, None]:
         async with self.session_factory() as session:
             yield session
@@ -45,4 +74,8 @@ db_helper = DataBaseHelper(
     echo_pool=settings.db.echo_pool,
     max_overflow=settings.db.max_overflow,
     pool_size=settings.db.pool_size,
-)
\ No newline at end of file
+    slow_query_threshold_ms=settings.db.slow_query_threshold_ms,
+    slow_query_log_size=settings.db.slow_query_log_size,
+)
+register_pool_gauges(db_helper.engine.sync_engine.pool)
+install_statement_timeout()
@@ -0,0 +1,100 @@
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import Counter, Gauge, Histogram, registry
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+    from sqlalchemy.pool import Pool
+
+CONNECT_STARTED_KEY = "connect_started"
+
+checkouts = Counter(
+    "db_pool_checkouts_total",
+    "Connections checked out from the pool",
+)
+checkout_timeouts = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a free connection",
+)
+connects = Counter(
+    "db_pool_connects_total",
+    "New DBAPI connections opened by the pool",
+)
+checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+)
+connect_seconds = Histogram(
+    "db_pool_connect_seconds",
+    "Time spent opening a new DBAPI connection",
+)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited.
+    SQLAlchemy has no "checkout started" event, so the wait
+    is measured around the pool's own getter.
+    """
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            checkout_timeouts.inc()
+            raise
+        finally:
+            checkout_wait_seconds.observe(perf_counter() - started)
+
+
+def _on_do_connect(dialect, conn_rec, cargs, cparams) -> None:
+    conn_rec.info[CONNECT_STARTED_KEY] = perf_counter()
+
+
+def _on_connect(dbapi_connection, connection_record) -> None:
+    connects.inc()
+    started = connection_record.info.pop(CONNECT_STARTED_KEY, None)
+    if started is not None:
+        connect_seconds.observe(perf_counter() - started)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    checkouts.inc()
+
+
+def instrument_engine(engine: "AsyncEngine") -> None:
+    event.listen(engine.sync_engine, "do_connect", _on_do_connect)
+    event.listen(engine.sync_engine.pool, "connect", _on_connect)
+    event.listen(engine.sync_engine.pool, "checkout", _on_checkout)
+
+
+def register_pool_gauges(pool: "Pool") -> None:
+    Gauge(
+        "db_pool_size",
+        "Configured number of persistent connections",
+        function=pool.size,
+    )
+    Gauge(
+        "db_pool_checked_out",
+        "Connections currently checked out",
+        function=pool.checkedout,
+    )
+    Gauge(
+        "db_pool_checked_in",
+        "Idle connections currently in the pool",
+        function=pool.checkedin,
+    )
+    Gauge(
+        "db_pool_overflow",
+        "Connections opened beyond pool_size (negative while below it)",
+        function=pool.overflow,
+    )
+
+
+def pool_snapshot() -> dict[str, dict]:
+    return registry.snapshot(prefix="db_pool_")
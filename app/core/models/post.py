@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import func, String, Text, ARRAY, ForeignKey
+from sqlalchemy import func, String, Text, ARRAY, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.types.user_id import UserIdType
@@ -14,10 +14,15 @@ if TYPE_CHECKING:
 
 
 class Post(IntIdPKMixin, Base):
+    __table_args__ = (
+        # delta sync: WHERE (updated_at, id) > (:updated_at, :id)
+        Index("ix_posts_updated_at_id", "updated_at", "id"),
+    )
+
+    # indexed by ix_posts_title_id below
     title: Mapped[str] = mapped_column(
         String(100),
         nullable=False,
-        index=True,
     )
     content: Mapped[str] = mapped_column(
         Text,
@@ -43,10 +48,30 @@ class Post(IntIdPKMixin, Base):
         onupdate=func.now(),
         nullable=False,
     )
+    # indexed by ix_posts_user_id_created_at_id below
     user_id: Mapped[UserIdType] = mapped_column(
         ForeignKey("users.id"),
-        index=True,
+        nullable=False,
+    )
+    # written in batches by crud.view_counter, does not touch updated_at
+    view_count: Mapped[int] = mapped_column(
+        default=0,
+        server_default="0",
         nullable=False,
     )
     user: Mapped["User"] = relationship(back_populates="posts")
     category: Mapped["Category"] = relationship(back_populates="posts")
+
+
+# One index per `order` option of the posts list, so the list is read
+# in index order and LIMIT stops the scan early instead of sorting
+Index("ix_posts_created_at_id", Post.created_at.desc(), Post.id)
+Index("ix_posts_title_id", Post.title, Post.id)
+Index("ix_posts_view_count_id", Post.view_count.desc(), Post.id)
+# Per-author listing, newest first
+Index(
+    "ix_posts_user_id_created_at_id",
+    Post.user_id,
+    Post.created_at.desc(),
+    Post.id.desc(),
+)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import func, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.types.user_id import UserIdType
+from .base import Base
+
+
+class PostTombstone(Base):
+    """
+    Trace of a deleted post, so delta-sync clients learn about deletions.
+    """
+
+    __table_args__ = (
+        Index("ix_post_tombstones_deleted_at_post_id", "deleted_at", "post_id"),
+    )
+
+    post_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    user_id: Mapped[UserIdType] = mapped_column(nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+        nullable=False,
+    )
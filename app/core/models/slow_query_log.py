@@ -0,0 +1,105 @@
+import asyncio
+import contextvars
+from collections import deque
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from sqlalchemy import event
+
+from core.logger import logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+QUERY_STARTED_KEY = "slow_query_started"
+SKIP_OPTION = "skip_slow_query_log"
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+MAX_PENDING_EXPLAINS = 2
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than `threshold_ms` and keeps the most
+    recent ones, with their plans, in a bounded ring buffer.
+    Plans are captured on a separate pooled connection in a
+    background task, so the slow request itself is not delayed.
+    """
+
+    def __init__(
+        self,
+        engine: "AsyncEngine",
+        threshold_ms: float,
+        size: int = 100,
+    ):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.entries: deque[dict[str, Any]] = deque(maxlen=size)
+        self._pending: set[asyncio.Task] = set()
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(QUERY_STARTED_KEY, []).append(perf_counter())
+
+    def _handle_error(self, exception_context) -> None:
+        connection = exception_context.connection
+        if connection is not None and connection.info.get(QUERY_STARTED_KEY):
+            connection.info[QUERY_STARTED_KEY].pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info[QUERY_STARTED_KEY].pop()
+        if elapsed < self.threshold:
+            return
+        if context is not None and context.execution_options.get(SKIP_OPTION):
+            return
+
+        logger.warning(
+            "Slow query (%.1f ms): %s; parameters=%r",
+            elapsed * 1000,
+            statement,
+            parameters,
+        )
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": statement,
+            "parameters": repr(parameters),
+            "plan": None,
+        }
+        self.entries.append(entry)
+
+        if (
+            executemany
+            or len(self._pending) >= MAX_PENDING_EXPLAINS
+            or not statement.lstrip().lower().startswith(EXPLAINABLE)
+        ):
+            return
+        # The event fires inside SQLAlchemy's greenlet on the loop thread.
+        # A fresh context: the EXPLAIN must not count towards the request's
+        # cost or run under its deadline and statement timeout
+        task = asyncio.get_running_loop().create_task(
+            self._explain(entry, statement, parameters),
+            context=contextvars.Context(),
+        )
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _explain(self, entry: dict[str, Any], statement: str, parameters) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(**{SKIP_OPTION: True})
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE off, FORMAT JSON) {statement}",
+                    parameters,
+                )
+                plan = result.scalar_one()
+        except Exception:
+            logger.exception("Could not capture plan for slow query")
+            return
+        entry["plan"] = orjson.loads(plan) if isinstance(plan, str) else plan
+
+    def recent(self) -> list[dict[str, Any]]:
+        return list(reversed(self.entries))
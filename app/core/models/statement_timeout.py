@@ -0,0 +1,32 @@
+from sqlalchemy import Connection, event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from core.deadline import remaining
+from core.exceptions import GatewayTimeoutError
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+
+def set_statement_timeout(
+    session: Session,
+    transaction: SessionTransaction,
+    connection: Connection,
+) -> None:
+    """
+    Limits every statement of the transaction to the time the request
+    has left, so a slow query gives its pooled connection back in time.
+    Transactions outside of a request keep the server default.
+    """
+    seconds = remaining()
+    if seconds is None:
+        return
+    if seconds <= 0:
+        raise GatewayTimeoutError()
+    # 0 would disable the timeout
+    timeout_ms = max(1, int(seconds * 1000))
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+def install_statement_timeout(session_class: type[Session] = Session) -> None:
+    event.listen(session_class, "after_begin", set_statement_timeout)
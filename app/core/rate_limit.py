@@ -0,0 +1,104 @@
+from time import monotonic
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from core.cache import CacheBackend, cache_client
+from core.config import settings, RateLimitRule
+from core.logger import logger
+from core.metrics import Counter
+
+rate_limited_total = Counter(
+    "rate_limited_total",
+    "Requests rejected with 429 by rate limit rule",
+    ("rule",),
+)
+rate_limit_fallbacks_total = Counter(
+    "rate_limit_fallbacks_total",
+    "Rate limit checks answered in process because Redis failed",
+)
+
+# Refills the bucket for the time since the last call and takes a token.
+# Returns {allowed, milliseconds until a token is available}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2]) / 1000
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, wait}
+"""
+
+
+class LocalTokenBuckets:
+    """
+    Same buckets in process memory, used while Redis is unreachable.
+    Limits are then per worker. Oldest keys are evicted past `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = 10_000):
+        self.max_keys = max_keys
+        self.buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, key: str, rule: RateLimitRule) -> float | None:
+        now = monotonic()
+        tokens, updated = self.buckets.pop(key, (rule.capacity, now))
+        tokens = min(rule.capacity, tokens + (now - updated) * rule.refill_per_second)
+        wait = None
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rule.refill_per_second
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            del self.buckets[next(iter(self.buckets))]
+        return wait
+
+
+class RateLimiter:
+    def __init__(self, client: CacheBackend, fallback: LocalTokenBuckets):
+        self.client = client
+        self.fallback = fallback
+        # Without Redis the in-process buckets are all there is
+        self.script = None
+        if isinstance(client, redis.Redis):
+            self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rule: RateLimitRule) -> float | None:
+        """
+        Takes a token, returns None when allowed or else the seconds
+        until the next token.
+        """
+        if self.script is None:
+            return self.fallback.take(key, rule)
+        try:
+            allowed, wait_ms = await self.script(
+                keys=[key],
+                args=[rule.capacity, rule.refill_per_second],
+            )
+        except (RedisError, OSError):
+            logger.warning("Rate limiting in process, Redis is unavailable")
+            rate_limit_fallbacks_total.inc()
+            return self.fallback.take(key, rule)
+        return None if allowed else wait_ms / 1000
+
+
+rate_limiter = RateLimiter(
+    client=cache_client,
+    fallback=LocalTokenBuckets(max_keys=settings.rate_limit.fallback_max_keys),
+)
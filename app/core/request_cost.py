@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterator
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+QUERY_STARTED_KEY = "request_cost_query_started"
+
+
+@dataclass
+class RequestCost:
+    db_count: int = 0
+    db_time: float = 0.0
+    cache_count: int = 0
+    cache_time: float = 0.0
+    serialize_time: float = 0.0
+    # Costs recorded in a nested scope also count towards the enclosing one
+    parent: "RequestCost | None" = field(default=None, repr=False)
+
+    def add_db(self, elapsed: float) -> None:
+        cost = self
+        while cost is not None:
+            cost.db_count += 1
+            cost.db_time += elapsed
+            cost = cost.parent
+
+    def add_cache(self, elapsed: float) -> None:
+        cost = self
+        while cost is not None:
+            cost.cache_count += 1
+            cost.cache_time += elapsed
+            cost = cost.parent
+
+    def add_serialize(self, elapsed: float) -> None:
+        cost = self
+        while cost is not None:
+            cost.serialize_time += elapsed
+            cost = cost.parent
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {
+            "db_count": self.db_count,
+            "db_ms": round(self.db_time * 1000, 3),
+            "cache_count": self.cache_count,
+            "cache_ms": round(self.cache_time * 1000, 3),
+            "serialize_ms": round(self.serialize_time * 1000, 3),
+        }
+
+    def server_timing(self, total: float) -> str:
+        return ", ".join(
+            (
+                f'db;dur={self.db_time * 1000:.3f};desc="{self.db_count} queries"',
+                f'cache;dur={self.cache_time * 1000:.3f};desc="{self.cache_count} commands"',
+                f"serialize;dur={self.serialize_time * 1000:.3f}",
+                f"total;dur={total * 1000:.3f}",
+            )
+        )
+
+
+_current_cost: ContextVar[RequestCost | None] = ContextVar(
+    "request_cost",
+    default=None,
+)
+
+
+def current_request_cost() -> RequestCost | None:
+    return _current_cost.get()
+
+
+@contextmanager
+def track_request_cost() -> Iterator[RequestCost]:
+    cost = RequestCost(parent=_current_cost.get())
+    token = _current_cost.set(cost)
+    try:
+        yield cost
+    finally:
+        _current_cost.reset(token)
+
+
+def record_cache_command(elapsed: float) -> None:
+    cost = _current_cost.get()
+    if cost is not None:
+        cost.add_cache(elapsed)
+
+
+@contextmanager
+def measure_serialization() -> Iterator[None]:
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        cost = _current_cost.get()
+        if cost is not None:
+            cost.add_serialize(perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(QUERY_STARTED_KEY, []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info[QUERY_STARTED_KEY].pop()
+    cost = _current_cost.get()
+    if cost is not None:
+        cost.add_db(perf_counter() - started)
+
+
+def _handle_error(exception_context) -> None:
+    # after_cursor_execute is skipped for failed statements
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(QUERY_STARTED_KEY):
+        started = connection.info[QUERY_STARTED_KEY].pop()
+        cost = _current_cost.get()
+        if cost is not None:
+            cost.add_db(perf_counter() - started)
+
+
+def track_engine_queries(engine: "AsyncEngine") -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+class CostTrackingORJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        with measure_serialization():
+            return super().render(content)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, field_validator
 
@@ -32,6 +33,7 @@ class PostRead(BaseModel):
     user: str
     created_at: datetime
     updated_at: datetime
+    view_count: int = 0
 
     @field_validator("category", mode="before")
     def get_category(cls, value):
@@ -48,3 +50,20 @@ class PostRead(BaseModel):
         if hasattr(value, "email"):
             return value.email
         return "Unknown"
+
+
+class PostChanges(BaseModel):
+    posts: list[PostRead]
+    deleted: list[int]
+    cursor: str
+    has_more: bool
+
+
+class PostPage(BaseModel):
+    posts: list[PostRead]
+    next_cursor: str | None
+
+
+class Suggestion(BaseModel):
+    text: str
+    kind: Literal["title", "category"]
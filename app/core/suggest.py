@@ -0,0 +1,238 @@
+import asyncio
+import heapq
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Awaitable, Callable, Iterable, Literal
+
+import orjson
+
+from core.cache import CacheBackend
+from core.config import settings
+from core.logger import logger
+
+Kind = Literal["title", "category"]
+Term = tuple[str, Kind]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class SuggestIndex:
+    """
+    Per-worker prefix index of post titles and category names:
+    a sorted list of (normalized text, kind) searched with bisect.
+    Entries are reference counted by the posts using them, so a title
+    disappears with its last post. At most `max_entries` are kept.
+
+    Prefixes of up to `ranked_prefix_length` characters match too many
+    keys to rank on every keystroke, so each of them keeps its keys
+    ranked by post count as they change.
+    """
+
+    def __init__(self, max_entries: int = 200_000, ranked_prefix_length: int = 2):
+        self.max_entries = max_entries
+        self.ranked_prefix_length = ranked_prefix_length
+        self.keys: list[tuple[str, Kind]] = []
+        # key -> [display text, number of posts]
+        self.entries: dict[tuple[str, Kind], list] = {}
+        # short prefix -> [(-number of posts, key)], sorted
+        self.ranked: dict[str, list[tuple[int, tuple[str, Kind]]]] = {}
+        # Changes up to this version are part of the loaded terms
+        self.loaded_version = 0
+
+    def _short_prefixes(self, text: str) -> set[str]:
+        return {text[:length] for length in range(1, self.ranked_prefix_length + 1)}
+
+    def _rerank(self, key: tuple[str, Kind], old_count: int, new_count: int) -> None:
+        for prefix in self._short_prefixes(key[0]):
+            ranked = self.ranked.setdefault(prefix, [])
+            if old_count > 0:
+                del ranked[bisect_left(ranked, (-old_count, key))]
+            if new_count > 0:
+                insort(ranked, (-new_count, key))
+            elif not ranked:
+                del self.ranked[prefix]
+
+    def add(self, text: str, kind: Kind, count: int = 1) -> None:
+        key = (normalize(text), kind)
+        if not key[0]:
+            return
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry[1] += count
+            self._rerank(key, entry[1] - count, entry[1])
+            return
+        if len(self.entries) >= self.max_entries:
+            return
+        self.entries[key] = [text, count]
+        insort(self.keys, key)
+        self._rerank(key, 0, count)
+
+    def remove(self, text: str, kind: Kind) -> None:
+        key = (normalize(text), kind)
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        self._rerank(key, entry[1] + 1, entry[1])
+        if entry[1] > 0:
+            return
+        del self.entries[key]
+        del self.keys[bisect_left(self.keys, key)]
+
+    def build(self, terms: Iterable[tuple[str, Kind, int]]) -> tuple[dict, list, dict]:
+        """
+        Entries, sorted keys and ranked prefixes for `terms`, without
+        touching the index, so it can run in a thread while the index is
+        in use. Keeps the first `max_entries` terms, so the most
+        important ones must come first.
+        """
+        entries: dict[tuple[str, Kind], list] = {}
+        for text, kind, count in terms:
+            key = (normalize(text), kind)
+            if not key[0]:
+                continue
+            if key in entries:
+                entries[key][1] += count
+            elif len(entries) < self.max_entries:
+                entries[key] = [text, count]
+        ranked: dict[str, list[tuple[int, tuple[str, Kind]]]] = {}
+        for key, (_, count) in entries.items():
+            for prefix in self._short_prefixes(key[0]):
+                ranked.setdefault(prefix, []).append((-count, key))
+        # Sorting once instead of insort keeps a large load linear-ish
+        for keys in ranked.values():
+            keys.sort()
+        return entries, sorted(entries), ranked
+
+    def replace(
+        self, entries: dict, keys: list, ranked: dict, loaded_version: int = 0
+    ) -> None:
+        """
+        Swaps in what `build` returned. Called on the event loop, so no
+        suggest() sees new entries paired with old keys.
+        """
+        self.entries, self.keys, self.ranked = entries, keys, ranked
+        self.loaded_version = loaded_version
+
+    def load(
+        self, terms: Iterable[tuple[str, Kind, int]], loaded_version: int = 0
+    ) -> None:
+        self.replace(*self.build(terms), loaded_version=loaded_version)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict[str, str]]:
+        """
+        The `limit` matching entries used by the most posts,
+        ties in alphabetical order.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= self.ranked_prefix_length:
+            top = [key for _, key in islice(self.ranked.get(prefix, ()), limit)]
+        else:
+            start = bisect_left(self.keys, (prefix,))
+            # Every key starting with the prefix sorts before prefix + U+10FFFF
+            stop = bisect_left(self.keys, (prefix + "\U0010ffff",), lo=start)
+            top = heapq.nsmallest(
+                limit,
+                islice(self.keys, start, stop),
+                key=lambda key: (-self.entries[key][1], key),
+            )
+        return [{"text": self.entries[key][0], "kind": key[1]} for key in top]
+
+    def apply(self, message: str | bytes) -> None:
+        changes = orjson.loads(message)
+        if changes.get("version", self.loaded_version + 1) <= self.loaded_version:
+            return
+        for text, kind in changes.get("remove", ()):
+            self.remove(text, kind)
+        for text, kind in changes.get("add", ()):
+            self.add(text, kind)
+
+
+def version_key() -> str:
+    return f"{settings.suggest.channel}:version"
+
+
+async def publish_suggest_changes(
+    client: CacheBackend,
+    add: Iterable[Term] = (),
+    remove: Iterable[Term] = (),
+) -> None:
+    """
+    Every worker, this one included, applies the change when it
+    arrives on the channel. Changes are numbered, so a worker loading
+    the index skips the ones its load already has.
+    """
+    add, remove = set(add), set(remove)
+    add, remove = add - remove, remove - add
+    if not add and not remove:
+        return
+    version = await client.incr(version_key())
+    message = orjson.dumps(
+        {"version": version, "add": list(add), "remove": list(remove)}
+    )
+    await client.publish(settings.suggest.channel, message)
+
+
+async def keep_index_current(
+    client: CacheBackend,
+    index: SuggestIndex,
+    load_terms: Callable[[], Awaitable[Iterable[tuple[str, Kind, int]]]],
+    retry_interval: float = 5.0,
+) -> None:
+    """
+    Subscribes, reads the current change version, then loads: changes
+    published from then on are applied once the index is ready, those
+    up to that version were committed before the load and are skipped.
+    (A change committed but not yet numbered when the version is read
+    is counted twice.) Loads again whenever the subscription was
+    interrupted, and retries every `retry_interval` seconds while Redis
+    or the database are down.
+    """
+    while True:
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(settings.suggest.channel)
+                loaded_version = int(await client.get(version_key()) or 0)
+                terms = await load_terms()
+                built = await asyncio.to_thread(index.build, terms)
+                index.replace(*built, loaded_version=loaded_version)
+                logger.info("Loaded %d suggest entries", len(index.keys))
+                await apply_changes(pubsub, index)
+            logger.warning("Suggest index subscription was interrupted, reloading")
+        except Exception:
+            logger.exception("Could not load the suggest index")
+            await asyncio.sleep(retry_interval)
+
+
+async def apply_changes(pubsub, index: SuggestIndex) -> None:
+    """
+    Applies changes until the subscription is confirmed a second time:
+    the connection dropped and was subscribed again, and whatever was
+    published meanwhile is lost.
+    """
+    subscribed = False
+    while True:
+        message = await pubsub.get_message(timeout=None)
+        if message is None:
+            continue
+        if message["type"] == "subscribe":
+            if subscribed:
+                return
+            subscribed = True
+            continue
+        if message["type"] != "message":
+            continue
+        try:
+            index.apply(message["data"])
+        except Exception:
+            logger.exception("Could not apply suggest index change")
+
+
+suggest_index = SuggestIndex(
+    max_entries=settings.suggest.max_entries,
+    ranked_prefix_length=settings.suggest.ranked_prefix_length,
+)
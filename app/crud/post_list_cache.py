@@ -0,0 +1,294 @@
+import asyncio
+import contextvars
+import hashlib
+from contextlib import suppress
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.cache import CACHE_ERRORS, CacheBackend, cache_client, cache_requests_total
+from core.cache.codec import CacheCodecError, encode_value, decode_value
+from core.cache.windows import window_range, pack_window, slice_window
+from core.config import settings
+from core.frequency_sketch import FrequencySketch
+from core.load_shedding import concurrency_slot
+from core.logger import logger
+from core.models import db_helper
+from core.request_cost import measure_serialization
+from core.schemas.post import PostRead
+from crud import posts as posts_crud
+
+# (search, order, category, window index)
+Window = tuple[str | None, str, str | None, int]
+
+
+def window_key(window: Window) -> str:
+    search, order, category, index = window
+    # Search and category are free text, joining them with ":" would let
+    # two queries share a key
+    filters = hashlib.sha1(orjson.dumps([search, category])).hexdigest()
+    return f"posts_cache:{order}:{filters}:{index}"
+
+
+def refresh_lock_key(window: Window) -> str:
+    return f"posts_cache_refresh:{window_key(window)}"
+
+
+class PostListCache:
+    """
+    Post list pages cut out of aligned windows cached in Redis.
+
+    A window is fresh for `fresh_ex` seconds and kept `stale_ex` seconds
+    longer. A stale window is served as is while a single background task
+    (one per worker, and one across workers through a SET NX lock)
+    reloads it, so popular lists never make requests wait on the
+    database when they expire. How often windows are requested is
+    counted in a frequency sketch; every `warm_interval` seconds the
+    `warm_top` most requested ones are reloaded before they go stale.
+    """
+
+    def __init__(
+        self,
+        client: CacheBackend,
+        session_factory: async_sessionmaker[AsyncSession],
+        window_size: int = 100,
+        fresh_ex: int = 60,
+        stale_ex: int = 60,
+        refresh_lock_ex: int = 30,
+        warm_top: int = 50,
+        warm_interval: float = 10.0,
+        sketch: FrequencySketch | None = None,
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.window_size = window_size
+        self.fresh_ex = fresh_ex
+        self.stale_ex = stale_ex
+        self.refresh_lock_ex = refresh_lock_ex
+        self.warm_top = warm_top
+        self.warm_interval = warm_interval
+        self.sketch = sketch or FrequencySketch(top=warm_top)
+        self._refreshing: set[Window] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._warmer: asyncio.Task | None = None
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        search: str | None,
+        limit: int,
+        offset: int,
+        order: str,
+        category: str | None,
+        use_cache: bool = True,
+    ) -> bytes:
+        """
+        The page as a JSON array. With `use_cache` false (the cache is
+        known to be down) it comes straight from the database.
+        """
+        windows: list[Window] = [
+            (search, order, category, index)
+            for index in window_range(offset, limit, self.window_size)
+        ]
+        cached = [None] * len(windows)
+        stale = []
+        if use_cache:
+            for window in windows:
+                self.sketch.add(window)
+            try:
+                cached, stale = await self._read(windows)
+            except CACHE_ERRORS:
+                use_cache = False
+        missing = [index for index, window in enumerate(cached) if window is None]
+        hits = len(windows) - len(missing)
+        cache_requests_total.inc(hits - len(stale), ("posts_cache", "hit"))
+        cache_requests_total.inc(len(stale), ("posts_cache", "stale"))
+        cache_requests_total.inc(
+            len(missing),
+            ("posts_cache", "miss" if use_cache else "unavailable"),
+        )
+        for window in stale:
+            self.schedule_refresh(window)
+
+        if missing:
+            # One query covers every missing window
+            first, last = missing[0], missing[-1]
+            loaded = await self._load(
+                session, windows[first], last - first + 1, close_session=True
+            )
+            for index in missing:
+                cached[index] = loaded[index - first]
+            if use_cache:
+                with suppress(*CACHE_ERRORS):
+                    await self._store(
+                        [(windows[index], cached[index]) for index in missing]
+                    )
+
+        page_start = offset - windows[0][3] * self.window_size
+        parts = [
+            slice_window(
+                window,
+                page_start - index * self.window_size,
+                page_start + limit - index * self.window_size,
+            )
+            for index, window in enumerate(cached)
+        ]
+        return b"[" + b",".join(part for part in parts if part) + b"]"
+
+    async def _read(
+        self, windows: list[Window]
+    ) -> tuple[list[bytes | None], list[Window]]:
+        """Cached windows (None when missing) and the stale ones among them."""
+        keys = [window_key(window) for window in windows]
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *ttls = await pipe.execute()
+        cached = [None if value is None else self._decode(value) for value in values]
+        stale = [
+            window
+            for window, value, ttl in zip(windows, cached, ttls)
+            # -1: no expiry, written by hand
+            if value is not None and 0 <= ttl <= self.stale_ex * 1000
+        ]
+        return cached, stale
+
+    @staticmethod
+    def _decode(value: bytes) -> bytes | None:
+        try:
+            return decode_value(value)
+        except CacheCodecError:
+            # A miss: the window is loaded again and overwritten
+            logger.warning("Could not decode a cached list window", exc_info=True)
+            return None
+
+    async def _load(
+        self,
+        session: AsyncSession,
+        first: Window,
+        count: int,
+        close_session: bool = False,
+    ) -> list[bytes]:
+        """`count` packed windows from the database, starting at `first`."""
+        search, order, category, index = first
+        async with concurrency_slot("db_read"):
+            posts = await posts_crud.get_all_posts(
+                session=session,
+                search=search,
+                limit=count * self.window_size,
+                offset=index * self.window_size,
+                order=order,
+                category=category,
+            )
+            if close_session:
+                # Hand the connection back before serializing and writing the cache
+                await session.close()
+        logger.info("Found %r posts", len(posts))
+        with measure_serialization():
+            rows = [
+                orjson.dumps(PostRead.model_validate(post).model_dump(mode="json"))
+                for post in posts
+            ]
+            return [
+                pack_window(rows[start : start + self.window_size])
+                for start in range(0, count * self.window_size, self.window_size)
+            ]
+
+    async def _store(self, windows: list[tuple[Window, bytes]]) -> None:
+        ex = self.fresh_ex + self.stale_ex
+        async with self.client.pipeline(transaction=False) as pipe:
+            for window, packed in windows:
+                pipe.set(window_key(window), encode_value(packed), ex=ex)
+            await pipe.execute()
+        logger.info("Saved %d list windows for %r seconds", len(windows), ex)
+
+    def schedule_refresh(self, window: Window) -> None:
+        if window in self._refreshing:
+            return
+        self._refreshing.add(window)
+        # A fresh context: the refresh must not inherit the request's
+        # deadline or count towards its cost
+        task = asyncio.create_task(self.refresh(window), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def refresh(self, window: Window) -> None:
+        """
+        Reloads the window unless another worker already is. Failures are
+        logged; the window stays stale until it expires or is retried.
+        """
+        self._refreshing.add(window)
+        try:
+            lock = refresh_lock_key(window)
+            if not await self.client.set(lock, 1, nx=True, ex=self.refresh_lock_ex):
+                return
+            try:
+                async with self.session_factory() as session:
+                    [packed] = await self._load(session, window, 1)
+                await self._store([(window, packed)])
+            finally:
+                await self.client.delete(lock)
+        except Exception:
+            logger.warning("Could not refresh %s", window_key(window), exc_info=True)
+        finally:
+            self._refreshing.discard(window)
+
+    async def warm(self) -> None:
+        """Reloads the hottest windows that go stale before the next run."""
+        windows = [
+            window
+            for window in self.sketch.most_common(self.warm_top)
+            if window not in self._refreshing
+        ]
+        if not windows:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for window in windows:
+                    pipe.pttl(window_key(window))
+                ttls = await pipe.execute()
+        except CACHE_ERRORS:
+            return
+        horizon = (self.stale_ex + self.warm_interval) * 1000
+        for window, ttl in zip(windows, ttls):
+            # -2: missing, -1: no expiry
+            if ttl == -2 or 0 <= ttl <= horizon:
+                # One at a time, warming must not crowd out requests
+                await self.refresh(window)
+
+    def start(self) -> None:
+        self._warmer = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks]
+        if self._warmer is not None:
+            tasks.append(self._warmer)
+            self._warmer = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.warm_interval)
+            await self.warm()
+
+
+post_list_cache = PostListCache(
+    client=cache_client,
+    session_factory=db_helper.session_factory,
+    window_size=settings.posts_cache.window,
+    fresh_ex=settings.redis.ex,
+    stale_ex=settings.posts_cache.stale_ex,
+    refresh_lock_ex=settings.posts_cache.refresh_lock_ex,
+    warm_top=settings.posts_cache.warm_top,
+    warm_interval=settings.posts_cache.warm_interval,
+    sketch=FrequencySketch(
+        width=settings.posts_cache.sketch_width,
+        depth=settings.posts_cache.sketch_depth,
+        top=settings.posts_cache.warm_top,
+    ),
+)
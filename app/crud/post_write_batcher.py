@@ -0,0 +1,165 @@
+import asyncio
+from contextlib import suppress
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import settings
+from core.exceptions import ServiceUnavailableError
+from core.logger import logger
+from core.models import db_helper
+from core.schemas.post import PostCreate, PostRead
+from core.types.user_id import UserIdType
+from .posts import create_posts
+
+PendingPost = tuple[PostCreate, UserIdType, asyncio.Future]
+
+
+class PostWriteBatcher:
+    """
+    Group commit for post creation: inserts arriving within
+    `max_delay_ms` of each other (or until `max_batch_size` are
+    queued) are written with one multi-row INSERT and one commit.
+    When a batch fails, its rows are retried one savepoint each,
+    so only the offending callers get the error. Once stopping, or if
+    the background task died, posts are refused with a 503 instead of
+    waiting for a write that never comes.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_batch_size: int = 100,
+        max_delay_ms: float = 5,
+    ):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self._queue: asyncio.Queue[PendingPost | None] = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    async def create_post(
+        self,
+        post_create: PostCreate,
+        user_id: UserIdType,
+    ) -> PostRead:
+        if self._stopping or self._task is None:
+            raise unavailable()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((post_create, user_id, future))
+        if self._queue.qsize() >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Posts queued before the sentinel are still written
+        if self._task is None:
+            return
+        self._stopping = True
+        self._queue.put_nowait(None)
+        self._full.set()
+        # A task that died has logged why already
+        with suppress(Exception):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        try:
+            await self._write_batches()
+        except Exception:
+            logger.exception("Post write batching stopped")
+            raise
+        finally:
+            self._stopping = True
+            # Nothing would ever write what is still queued
+            while not self._queue.empty():
+                pending = self._queue.get_nowait()
+                if pending is not None:
+                    fail_pending([pending])
+
+    async def _write_batches(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                return
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._full.wait(), self.max_delay)
+            batch = [first]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                pending = self._queue.get_nowait()
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+            if self._queue.qsize() < self.max_batch_size:
+                self._full.clear()
+            try:
+                await self._write(batch)
+            except BaseException:
+                fail_pending(batch)
+                raise
+
+    async def _write(self, batch: list[PendingPost]) -> None:
+        try:
+            async with self.session_factory() as session:
+                posts = await create_posts(
+                    session=session,
+                    posts_create=[(post, user_id) for post, user_id, _ in batch],
+                )
+                await session.commit()
+        except Exception:
+            logger.warning("Batch of %d posts failed, retrying one by one", len(batch))
+            await self._write_one_by_one(batch)
+            return
+        for (_, _, future), post in zip(batch, posts):
+            if not future.done():
+                future.set_result(post)
+
+    async def _write_one_by_one(self, batch: list[PendingPost]) -> None:
+        written = []
+        try:
+            async with self.session_factory() as session:
+                for post_create, user_id, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            [post] = await create_posts(
+                                session=session,
+                                posts_create=[(post_create, user_id)],
+                            )
+                    except Exception as exc:
+                        if not future.done():
+                            future.set_exception(exc)
+                        continue
+                    written.append((future, post))
+                await session.commit()
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, post in written:
+            if not future.done():
+                future.set_result(post)
+
+
+def unavailable() -> ServiceUnavailableError:
+    return ServiceUnavailableError(retry_after=1, detail="Post writes are paused")
+
+
+def fail_pending(batch: list[PendingPost]) -> None:
+    for _, _, future in batch:
+        if not future.done():
+            future.set_exception(unavailable())
+
+
+post_write_batcher = PostWriteBatcher(
+    session_factory=db_helper.session_factory,
+    max_batch_size=settings.db.write_batching.max_batch_size,
+    max_delay_ms=settings.db.write_batching.max_delay_ms,
+)
@@ -1,10 +1,31 @@
-from sqlalchemy import select, or_, Select
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import (
+    ARRAY,
+    Integer,
+    String,
+    Text,
+    cast,
+    column,
+    values,
+    select,
+    or_,
+    Select,
+    update,
+    delete,
+    func,
+    tuple_,
+    true,
+    FromClause,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
 
-from core.models import Post, Category
-from core.schemas.post import PostCreate, PostUpdate
+from core.models import Post, Category, User, PostTombstone
+from core.schemas.post import PostCreate, PostUpdate, PostRead
 from core.types.user_id import UserIdType
 
 
@@ -14,15 +35,34 @@ async def get_all_posts(
     limit: int = 10,
     offset: int = 0,
     order: str = "id",
+    category: str | None = None,
 ) -> list[Post]:
-    statement = (
-        select(Post)
-        .options(
-            selectinload(Post.category),
-            selectinload(Post.user),
-        )
-        .order_by(Post.id)
+    statement = select_posts(
+        search=search,
+        limit=limit,
+        offset=offset,
+        order=order,
+        category=category,
     )
+    result: Result = await session.execute(statement)
+    posts = result.scalars().all()
+    return list(posts)
+
+
+def select_posts(
+    search: str | None = None,
+    limit: int = 10,
+    offset: int = 0,
+    order: str = "id",
+    category: str | None = None,
+) -> Select:
+    statement = select(Post).options(
+        selectinload(Post.category),
+        selectinload(Post.user),
+    )
+
+    if category:
+        statement = statement.where(Post.category.has(Category.name == category))
 
     if search:
         statement = statement.where(
@@ -32,21 +72,133 @@ async def get_all_posts(
             )
         )
     statement = apply_ordering(statement, order)
-    statement = statement.limit(limit).offset(offset)
-
-    result: Result = await session.execute(statement)
-    posts = result.scalars().all()
-    return list(posts)
+    return statement.limit(limit).offset(offset)
 
 
 def apply_ordering(statement: Select, order: str) -> Select:
+    # id breaks ties so pages are stable; each variant matches an index
     if order == "title":
-        return statement.order_by(Post.title.asc())
+        return statement.order_by(Post.title.asc(), Post.id.asc())
     if order == "created_at":
-        return statement.order_by(Post.created_at.desc())
+        return statement.order_by(Post.created_at.desc(), Post.id.asc())
+    if order == "views":
+        return statement.order_by(Post.view_count.desc(), Post.id.asc())
     return statement.order_by(Post.id.asc())
 
 
+async def get_author_posts(
+    session: AsyncSession,
+    user_id: UserIdType,
+    limit: int,
+    before: tuple[datetime, int] | None = None,
+) -> list[PostRead]:
+    """
+    The author's posts, newest first, starting after the
+    `(created_at, id)` position of the previous page.
+    """
+    posts = Post.__table__
+    statement = (
+        select_post_read(posts)
+        .where(posts.c.user_id == user_id)
+        .order_by(posts.c.created_at.desc(), posts.c.id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        statement = statement.where(
+            tuple_(posts.c.created_at, posts.c.id) < tuple_(*before)
+        )
+    result = await session.execute(statement)
+    return [PostRead.model_validate(dict(row)) for row in result.mappings()]
+
+
+async def get_latest_posts(
+    session: AsyncSession,
+    limit: int,
+    created_since: datetime | None = None,
+) -> list[PostRead]:
+    posts = Post.__table__
+    statement = (
+        select_post_read(posts)
+        .order_by(posts.c.created_at.desc(), posts.c.id.asc())
+        .limit(limit)
+    )
+    if created_since is not None:
+        statement = statement.where(posts.c.created_at >= created_since)
+    result = await session.execute(statement)
+    return [PostRead.model_validate(dict(row)) for row in result.mappings()]
+
+
+async def get_latest_posts_by_category(
+    session: AsyncSession,
+    limit: int,
+) -> dict[str, list[PostRead]]:
+    """
+    Newest `limit` posts of every category, in one LATERAL query.
+    """
+    posts = Post.__table__
+    latest = (
+        select(posts)
+        .where(posts.c.category_id == Category.id)
+        .order_by(posts.c.created_at.desc(), posts.c.id.asc())
+        .limit(limit)
+        .lateral("latest")
+    )
+    statement = (
+        select(
+            latest,
+            Category.name.label("category"),
+            User.email.label("user"),
+        )
+        .select_from(Category)
+        .join(latest, true())
+        .join(User, User.id == latest.c.user_id)
+    )
+    result = await session.execute(statement)
+    posts_by_category: dict[str, list[PostRead]] = {}
+    for row in result.mappings():
+        post = PostRead.model_validate(dict(row))
+        posts_by_category.setdefault(post.category, []).append(post)
+    return posts_by_category
+
+
+async def get_suggest_terms(
+    session: AsyncSession,
+    limit: int,
+) -> list[tuple[str, str, int]]:
+    """
+    `(text, kind, number of posts)` for every category that has posts,
+    then the most used titles, `limit` terms in all.
+    """
+    posts_count = func.count().label("posts_count")
+    categories = (
+        select(Category.name, func.count(Post.id))
+        .join(Post, Post.category_id == Category.id)
+        .group_by(Category.id)
+        .limit(limit)
+    )
+    category_rows = (await session.execute(categories)).tuples().all()
+    titles = (
+        select(Post.title, posts_count)
+        .group_by(Post.title)
+        .order_by(posts_count.desc())
+        .limit(limit - len(category_rows))
+    )
+    title_rows = (await session.execute(titles)).tuples().all()
+    # Categories first: SuggestIndex.load keeps the first `limit` terms
+    return [(name, "category", count) for name, count in category_rows] + [
+        (title, "title", count) for title, count in title_rows
+    ]
+
+
+async def user_exists(
+    session: AsyncSession,
+    user_id: UserIdType,
+) -> bool:
+    statement = select(User.id).where(User.id == user_id)
+    result = await session.execute(statement)
+    return result.scalar_one_or_none() is not None
+
+
 async def get_post_by_id(
     session: AsyncSession,
     post_id: int,
@@ -65,58 +217,242 @@ async def create_post(
     session: AsyncSession,
     post_create: PostCreate,
     user_id: UserIdType,
-):
-    category = await get_or_create_category(
+) -> PostRead:
+    [post] = await create_posts(
         session=session,
-        category_name=post_create.category,
-    )
-    post_data = post_create.model_dump()
-    post_data.pop("category", None)
-    post = Post(
-        **post_data,
-        user_id=user_id,
-        category_id=category.id,
+        posts_create=[(post_create, user_id)],
     )
-    session.add(post)
     await session.commit()
-    await session.refresh(post)
-    stmt = (
-        select(Post)
-        .options(selectinload(Post.category), selectinload(Post.user))
-        .where(Post.id == post.id)
-    )
-    result = await session.execute(stmt)
-    post = result.scalar_one()
     return post
 
 
+async def create_posts(
+    session: AsyncSession,
+    posts_create: list[tuple[PostCreate, UserIdType]],
+) -> list[PostRead]:
+    """
+    Inserts all posts with one multi-row INSERT, in the caller's
+    transaction. Results come back in the order of `posts_create`.
+    """
+    category_ids = await get_or_create_category_ids(
+        session=session,
+        category_names={post_create.category for post_create, _ in posts_create},
+    )
+    new_posts = values(
+        column("ordinal", Integer),
+        column("title", String),
+        column("content", Text),
+        column("tags", ARRAY(String)),
+        column("category_id", Integer),
+        column("user_id", Integer),
+        name="new_posts",
+    ).data(
+        [
+            (
+                ordinal,
+                post_create.title,
+                post_create.content,
+                post_create.tags,
+                category_ids[post_create.category],
+                user_id,
+            )
+            for ordinal, (post_create, user_id) in enumerate(posts_create)
+        ]
+    )
+    # Ids are drawn up front next to each row's ordinal, the order
+    # RETURNING produces them in is not guaranteed
+    numbered = select(
+        *(new_posts.c[name] for name in ("ordinal", "title", "content")),
+        # A column of NULLs only would come out of VALUES as text
+        cast(new_posts.c.tags, Post.tags.type).label("tags"),
+        new_posts.c.category_id,
+        new_posts.c.user_id,
+        func.nextval(func.pg_get_serial_sequence(Post.__tablename__, "id")).label("id"),
+    ).cte("numbered_posts")
+    columns = ["id", "title", "content", "tags", "category_id", "user_id"]
+    inserted = (
+        insert(Post)
+        .from_select(columns, select(*(numbered.c[name] for name in columns)))
+        .returning(*Post.__table__.columns)
+        .cte("inserted_posts")
+    )
+    statement = (
+        select_post_read(inserted)
+        .join(numbered, numbered.c.id == inserted.c.id)
+        .order_by(numbered.c.ordinal)
+    )
+    result = await session.execute(statement)
+    return [PostRead.model_validate(dict(row)) for row in result.mappings()]
+
+
+def select_post_read(posts: FromClause) -> Select:
+    # Category name and author email are all PostRead needs
+    # from the related rows, so join them instead of selectinload
+    return (
+        select(
+            posts,
+            Category.name.label("category"),
+            User.email.label("user"),
+        )
+        .join(Category, Category.id == posts.c.category_id)
+        .join(User, User.id == posts.c.user_id)
+    )
+
+
+class PostUpdated(NamedTuple):
+    post: PostRead
+    previous_title: str
+    previous_category: str
+
+
 async def update_post(
     session: AsyncSession,
-    post: Post,
+    post_id: int,
+    user_id: UserIdType,
     post_update: PostUpdate,
-) -> Post:
+) -> PostUpdated | None:
+    """
+    Updates the post only if it belongs to `user_id`, returns None when
+    no such post exists. A new category is created in the same
+    transaction, so it is rolled back with it when the post is not found.
+    """
     update_data = post_update.model_dump(exclude_unset=True)
     if "category" in update_data:
         category_name = update_data.pop("category")
-        category = await get_or_create_category(
+        category_ids = await get_or_create_category_ids(
             session=session,
-            category_name=category_name,
+            category_names={category_name},
         )
-        post.category_id = category.id
+        update_data["category_id"] = category_ids[category_name]
 
-    for name, value in update_data.items():
-        setattr(post, name, value)
+    # Locks the author's row and keeps its pre-update values for RETURNING
+    previous = (
+        select(Post.id, Post.title, Post.category_id)
+        .where(Post.id == post_id, Post.user_id == user_id)
+        .with_for_update()
+        .cte("previous_post")
+    )
+    updated = (
+        update(Post)
+        .where(Post.id == previous.c.id)
+        .values(**update_data, updated_at=func.now())
+        .returning(
+            *Post.__table__.columns,
+            previous.c.title.label("previous_title"),
+            previous.c.category_id.label("previous_category_id"),
+        )
+        .cte("updated_post")
+    )
+    previous_category = aliased(Category)
+    statement = (
+        select_post_read(updated)
+        .add_columns(previous_category.name.label("previous_category"))
+        .join(
+            previous_category,
+            previous_category.id == updated.c.previous_category_id,
+        )
+    )
+    result = await session.execute(statement)
+    row = result.mappings().one_or_none()
+    if row is None:
+        await session.rollback()
+        return None
     await session.commit()
-    await session.refresh(post)
-    return post
+    return PostUpdated(
+        post=PostRead.model_validate(dict(row)),
+        previous_title=row["previous_title"],
+        previous_category=row["previous_category"],
+    )
 
 
 async def delete_post(
     session: AsyncSession,
-    post: Post,
-) -> None:
-    await session.delete(post)
+    post_id: int,
+    user_id: UserIdType,
+) -> PostRead | None:
+    """
+    Deletes the post and leaves a tombstone for delta sync
+    in the same statement. Returns the deleted post.
+    """
+    deleted = (
+        delete(Post)
+        .where(Post.id == post_id, Post.user_id == user_id)
+        .returning(*Post.__table__.columns)
+        .cte("deleted_post")
+    )
+    tombstone = (
+        insert(PostTombstone)
+        .from_select(
+            ["post_id", "user_id"],
+            select(deleted.c.id, deleted.c.user_id),
+        )
+        .cte("post_tombstone")
+    )
+    statement = select_post_read(deleted).add_cte(tombstone)
+    result = await session.execute(statement)
+    row = result.mappings().one_or_none()
     await session.commit()
+    if row is None:
+        return None
+    return PostRead.model_validate(dict(row))
+
+
+async def get_changed_posts(
+    session: AsyncSession,
+    after: tuple[datetime, int],
+    limit: int,
+    settle_seconds: float = 0,
+) -> list[PostRead]:
+    """
+    Posts created or updated after the `(updated_at, id)` position,
+    oldest first. Walks the (updated_at, id) index.
+    """
+    posts = Post.__table__
+    statement = (
+        select_post_read(posts)
+        .where(
+            tuple_(posts.c.updated_at, posts.c.id) > tuple_(*after),
+            posts.c.updated_at
+            < func.localtimestamp() - timedelta(seconds=settle_seconds),
+        )
+        .order_by(posts.c.updated_at, posts.c.id)
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return [PostRead.model_validate(dict(row)) for row in result.mappings()]
+
+
+async def get_deleted_posts(
+    session: AsyncSession,
+    after: tuple[datetime, int],
+    limit: int,
+    settle_seconds: float = 0,
+) -> list[tuple[datetime, int]]:
+    """
+    `(deleted_at, post_id)` of posts deleted after the given position,
+    oldest first.
+    """
+    statement = (
+        select(PostTombstone.deleted_at, PostTombstone.post_id)
+        .where(
+            tuple_(PostTombstone.deleted_at, PostTombstone.post_id) > tuple_(*after),
+            PostTombstone.deleted_at
+            < func.localtimestamp() - timedelta(seconds=settle_seconds),
+        )
+        .order_by(PostTombstone.deleted_at, PostTombstone.post_id)
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return list(result.tuples().all())
+
+
+async def get_post_author_id(
+    session: AsyncSession,
+    post_id: int,
+) -> UserIdType | None:
+    statement = select(Post.user_id).where(Post.id == post_id)
+    result = await session.execute(statement)
+    return result.scalar_one_or_none()
 
 
 async def get_or_create_category(
@@ -132,3 +468,35 @@ async def get_or_create_category(
         await session.commit()
         await session.refresh(category)
     return category
+
+
+async def get_or_create_category_ids(
+    session: AsyncSession,
+    category_names: set[str],
+) -> dict[str, int]:
+    """
+    Resolves names to ids without committing, creating the missing
+    categories. Safe against concurrent inserts of the same name.
+    """
+    statement = select(Category.name, Category.id).where(
+        Category.name.in_(category_names)
+    )
+    result = await session.execute(statement)
+    category_ids = dict(result.tuples().all())
+    missing = category_names - category_ids.keys()
+    if missing:
+        statement = (
+            insert(Category)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=[Category.name])
+            .returning(Category.name, Category.id)
+        )
+        result = await session.execute(statement)
+        category_ids.update(result.tuples().all())
+        missing -= category_ids.keys()
+    if missing:
+        # Inserted by a concurrent transaction in the meantime
+        statement = select(Category.name, Category.id).where(Category.name.in_(missing))
+        result = await session.execute(statement)
+        category_ids.update(result.tuples().all())
+    return category_ids
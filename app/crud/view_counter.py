@@ -0,0 +1,143 @@
+import asyncio
+from collections import Counter
+from contextlib import suppress
+
+from sqlalchemy import Integer, Update, column, update, values
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import settings
+from core.logger import logger
+from core.metrics import Counter as MetricCounter
+from core.models import db_helper, Post
+
+views_dropped_total = MetricCounter(
+    "views_dropped_total",
+    "Post views not counted because too many posts had pending views",
+)
+
+
+class ViewCounter:
+    """
+    Write-behind view counts: `record` only bumps an in-memory counter,
+    a background task adds the accumulated deltas to `posts.view_count`
+    every `flush_interval` seconds, or as soon as `max_pending` posts
+    have views, with one UPDATE ... FROM (VALUES ...) per batch.
+    Deltas of a failed flush are kept for the next one; while flushes
+    fail the retries back off up to `max_backoff` seconds, and views of
+    posts past `max_tracked` are dropped.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        flush_interval: float = 5.0,
+        max_pending: int = 10_000,
+        batch_size: int = 1_000,
+        max_tracked: int = 100_000,
+        max_backoff: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_tracked = max_tracked
+        self.max_backoff = max_backoff
+        self._pending: Counter[int] = Counter()
+        self._full = asyncio.Event()
+        self._failures = 0
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    def record(self, post_id: int) -> None:
+        if post_id not in self._pending and len(self._pending) >= self.max_tracked:
+            views_dropped_total.inc()
+            return
+        self._pending[post_id] += 1
+        # While flushes fail only the backoff triggers the next one
+        if len(self._pending) >= self.max_pending and not self._failures:
+            self._full.set()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # The task flushes once more before it exits
+        if self._task is None:
+            return
+        self._stopping = True
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            delay = min(
+                self.flush_interval * 2**self._failures,
+                max(self.max_backoff, self.flush_interval),
+            )
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._full.wait(), delay)
+            self._full.clear()
+            await self.flush()
+        # Views recorded while the last flush ran
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Returns False when the deltas could not be written."""
+        pending, self._pending = self._pending, Counter()
+        if not pending:
+            return True
+        # Sorted ids keep the row lock order the same across workers;
+        # if a flush still fails, its deltas wait for the next one
+        deltas = sorted(pending.items())
+        try:
+            async with self.session_factory() as session:
+                for start in range(0, len(deltas), self.batch_size):
+                    batch = deltas[start : start + self.batch_size]
+                    await session.execute(add_views_statement(batch))
+                await session.commit()
+        except Exception:
+            logger.exception("Could not flush views of %d posts", len(pending))
+            self._restore(pending)
+            self._failures += 1
+            return False
+        self._failures = 0
+        return True
+
+    def _restore(self, pending: Counter[int]) -> None:
+        # Views recorded during the flush are already pending, the merge
+        # must not take the count of posts past `max_tracked`
+        dropped = 0
+        for post_id, views in pending.items():
+            if post_id in self._pending or len(self._pending) < self.max_tracked:
+                self._pending[post_id] += views
+            else:
+                dropped += views
+        if dropped:
+            views_dropped_total.inc(dropped)
+
+
+def add_views_statement(deltas: list[tuple[int, int]]) -> Update:
+    view_deltas = values(
+        column("post_id", Integer),
+        column("delta", Integer),
+        name="view_deltas",
+    ).data(deltas)
+    return (
+        update(Post).where(Post.id == view_deltas.c.post_id)
+        # Explicit, otherwise onupdate would bump it and flood delta sync
+        .values(
+            view_count=Post.view_count + view_deltas.c.delta,
+            updated_at=Post.updated_at,
+        )
+    )
+
+
+view_counter = ViewCounter(
+    session_factory=db_helper.session_factory,
+    flush_interval=settings.db.view_counts.flush_interval,
+    max_pending=settings.db.view_counts.max_pending,
+    batch_size=settings.db.view_counts.batch_size,
+    max_tracked=settings.db.view_counts.max_tracked,
+    max_backoff=settings.db.view_counts.max_backoff,
+)
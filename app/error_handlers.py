@@ -1,8 +1,15 @@
 from typing import TYPE_CHECKING
 
+from fastapi import status
 from fastapi.responses import ORJSONResponse
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 from core.exceptions import NotFoundError, UnauthorizedError, ForbiddenError
+from core.logger import logger
+from core.models.statement_timeout import QUERY_CANCELED
 from main import main_app
 
 if TYPE_CHECKING:
@@ -37,3 +44,31 @@ async def forbidden_exception_handler(request: "Request", exc: ForbiddenError):
             "detail": exc.detail,
         },
     )
+
+
+@main_app.exception_handler(DBAPIError)
+async def database_error_handler(request: "Request", exc: DBAPIError):
+    # Only statements cut off by the request deadline get a clean answer
+    if getattr(exc.orig, "pgcode", None) != QUERY_CANCELED:
+        raise exc
+    logger.warning("Statement cancelled at the request deadline")
+    return ORJSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={
+            "detail": "Request deadline exceeded",
+        },
+    )
+
+
+@main_app.exception_handler(PoolTimeoutError)
+@main_app.exception_handler(RedisTimeoutError)
+@main_app.exception_handler(RedisConnectionError)
+async def unavailable_exception_handler(request: "Request", exc: Exception):
+    logger.warning("Dependency unavailable: %r", exc)
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "detail": "Service temporarily unavailable",
+        },
+        headers={"Retry-After": "1"},
+    )
@@ -1,33 +1,100 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 import uvicorn
 from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse
 
+from actions.rebuild_latest_posts import keep_latest_posts_ready
 from api import router as api_router
-from core.cache import redis_client
+from api.metrics import router as metrics_router
+from core.cache import CACHE_ERRORS, cache_client
 from core.config import settings
+from core.logger import logger
+from core.metrics import write_snapshots_periodically
 from core.models import db_helper
+from core.request_cost import CostTrackingORJSONResponse
+from core.suggest import keep_index_current, suggest_index
+from crud import posts as posts_crud
+from crud.post_list_cache import post_list_cache
+from crud.post_write_batcher import post_write_batcher
+from crud.view_counter import view_counter
+from middlewares import MetricsMiddleware, RequestCostMiddleware, RequestIdMiddleware
+
+
+async def load_suggest_terms():
+    async with db_helper.session_factory() as session:
+        return await posts_crud.get_suggest_terms(
+            session=session,
+            limit=settings.suggest.max_entries,
+        )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
-    await redis_client.ping()
+    try:
+        await cache_client.ping()
+    except CACHE_ERRORS:
+        # Reads fall back to the database until Redis is back
+        logger.warning("Cache is unavailable at startup", exc_info=True)
+    await db_helper.prewarm(settings.db.pool_prewarm)
+    metrics_writer = None
+    if settings.metrics.multiprocess_dir:
+        metrics_writer = asyncio.create_task(
+            write_snapshots_periodically(
+                settings.metrics.multiprocess_dir,
+                settings.metrics.flush_interval,
+            )
+        )
+    if settings.db.write_batching.enabled:
+        post_write_batcher.start()
+    view_counter.start()
+    post_list_cache.start()
+    feed_rebuild = None
+    if settings.latest_posts.rebuild_on_startup:
+        # Until the feed is built the reads fall back to the database
+        feed_rebuild = asyncio.create_task(
+            keep_latest_posts_ready(settings.latest_posts.rebuild_interval)
+        )
+    suggest_updates = asyncio.create_task(
+        keep_index_current(cache_client, suggest_index, load_suggest_terms)
+    )
     yield
     # shutdown
-    await redis_client.close()
+    suggest_updates.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await suggest_updates
+    if feed_rebuild is not None:
+        feed_rebuild.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await feed_rebuild
+    await post_list_cache.stop()
+    await post_write_batcher.stop()
+    await view_counter.stop()
+    if metrics_writer is not None:
+        metrics_writer.cancel()
+        with suppress(asyncio.CancelledError):
+            await metrics_writer
+    await cache_client.close()
     await db_helper.dispose()
 
 
 main_app = FastAPI(
-    default_response_class=ORJSONResponse,
+    default_response_class=CostTrackingORJSONResponse,
     lifespan=lifespan,
 )
+main_app.add_middleware(RequestCostMiddleware)
+main_app.add_middleware(MetricsMiddleware)
+main_app.add_middleware(RequestIdMiddleware)
 main_app.include_router(
     api_router,
 )
+main_app.include_router(
+    metrics_router,
+)
 
+# Registers exception handlers on main_app, so it has to come last
+import error_handlers  # noqa: E402, F401
 
 if __name__ == "__main__":
     uvicorn.run(
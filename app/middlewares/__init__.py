@@ -0,0 +1,9 @@
+__all__ = [
+    "MetricsMiddleware",
+    "RequestCostMiddleware",
+    "RequestIdMiddleware",
+]
+
+from .metrics import MetricsMiddleware
+from .request_cost import RequestCostMiddleware
+from .request_id import RequestIdMiddleware
@@ -0,0 +1,77 @@
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from core.metrics import Counter, Histogram
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UNMATCHED_ROUTE = "<unmatched>"
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status",
+    ("method", "route", "status"),
+)
+request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+)
+request_size_bytes = Histogram(
+    "http_request_size_bytes",
+    "HTTP request body size by route template",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS,
+)
+response_size_bytes = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size by route template",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, request/response sizes and status per route
+    template (`/api/v1/posts/{post_id}`, not the concrete path),
+    which keeps label cardinality bounded.
+    """
+
+    def __init__(self, app: "ASGIApp"):
+        self.app = app
+
+    async def __call__(self, scope: "Scope", receive: "Receive", send: "Send"):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status_code = 500
+        response_size = 0
+
+        async def send_with_metrics(message: "Message") -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            route = scope.get("route")
+            labels = (
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+            )
+            request_duration_seconds.observe(perf_counter() - started, labels)
+            requests_total.inc(labels=(*labels, str(status_code)))
+            response_size_bytes.observe(response_size, labels)
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    request_size_bytes.observe(int(value), labels)
+                    break
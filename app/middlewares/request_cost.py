@@ -0,0 +1,72 @@
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from starlette.datastructures import MutableHeaders
+
+from core.logger import logger
+from core.request_cost import track_request_cost
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestCostMiddleware:
+    """
+    Counts SQL statements, cache commands and serialization time
+    spent on each request and reports them in a `Server-Timing`
+    header and a log line.
+    """
+
+    def __init__(self, app: "ASGIApp"):
+        self.app = app
+
+    async def __call__(self, scope: "Scope", receive: "Receive", send: "Send"):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status_code = 500
+
+        with track_request_cost() as cost:
+
+            async def send_with_timing(message: "Message") -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        cost.server_timing(perf_counter() - started),
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                route = scope.get("route")
+                path = route.path if route is not None else scope["path"]
+                total_ms = (perf_counter() - started) * 1000
+                logger.info(
+                    "Request cost: method=%s path=%s status=%d total_ms=%.3f "
+                    "db_count=%d db_ms=%.3f cache_count=%d cache_ms=%.3f "
+                    "serialize_ms=%.3f",
+                    scope["method"],
+                    path,
+                    status_code,
+                    total_ms,
+                    cost.db_count,
+                    cost.db_time * 1000,
+                    cost.cache_count,
+                    cost.cache_time * 1000,
+                    cost.serialize_time * 1000,
+                    extra={
+                        "request_cost": {
+                            "method": scope["method"],
+                            "path": path,
+                            "status": status_code,
+                            "total_ms": round(total_ms, 3),
+                            **cost.as_dict(),
+                        },
+                    },
+                )
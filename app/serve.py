@@ -0,0 +1,82 @@
+"""
+Production entry point: several uvicorn workers configured from RunConfig.
+
+    python serve.py
+
+Workers are spawned processes that import `main` themselves, so each one
+opens its own DB and Redis pools on first use in its own event loop.
+On SIGTERM uvicorn stops accepting connections, waits up to
+`timeout_graceful_shutdown` seconds for in-flight requests and then runs
+the lifespan shutdown, which closes the pools.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+from core.config import settings
+from core.logger import logger
+
+METRICS_DIR_ENV = "APP_CONFIG__METRICS__MULTIPROCESS_DIR"
+
+
+def prepare_metrics_dir(workers: int) -> None:
+    directory = settings.metrics.multiprocess_dir
+    if directory is None:
+        if workers == 1:
+            return
+        # Without a shared directory every scrape would see one worker only
+        directory = os.path.join(tempfile.gettempdir(), f"app-metrics-{os.getpid()}")
+        os.environ[METRICS_DIR_ENV] = directory
+    os.makedirs(directory, exist_ok=True)
+    # Snapshots left by a previous run belong to processes that no longer
+    # exist; only those are removed, the directory may hold other files
+    for pattern in ("*.json", "*.tmp"):
+        for path in Path(directory).glob(pattern):
+            path.unlink(missing_ok=True)
+
+
+def max_requests(workers: int) -> int | None:
+    limit = settings.run.limit_max_requests
+    if limit is not None and workers == 1:
+        # A single worker runs without a supervisor, hitting the limit
+        # would stop the server instead of restarting the worker
+        logger.warning("limit_max_requests needs several workers, ignoring it")
+        return None
+    return limit
+
+
+def worker_count() -> int:
+    workers = settings.run.workers
+    if settings.redis.backend != "memory":
+        return workers or os.cpu_count() or 1
+    # Every worker would have its own feeds and caches, and writes handled
+    # by one worker would never reach the others
+    if workers is not None and workers > 1:
+        raise SystemExit("The memory cache backend runs with a single worker only")
+    return 1
+
+
+def main() -> None:
+    run = settings.run
+    workers = worker_count()
+    prepare_metrics_dir(workers)
+    uvicorn.run(
+        "main:main_app",
+        host=run.host,
+        port=run.port,
+        workers=workers,
+        loop=run.loop,
+        http=run.http,
+        timeout_keep_alive=run.timeout_keep_alive,
+        backlog=run.backlog,
+        timeout_graceful_shutdown=run.timeout_graceful_shutdown,
+        limit_max_requests=max_requests(workers),
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
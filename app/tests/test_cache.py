@@ -0,0 +1,182 @@
+import asyncio
+
+import orjson
+import pytest
+from httpx import AsyncClient
+
+from core.cache import CacheCircuitOpenError, MemoryCache, cache_client
+from core.cache.codec import RAW, ZLIB, CacheCodecError, encode_value, decode_value
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.frequency_sketch import FrequencySketch
+from crud.post_list_cache import PostListCache, window_key
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_memory_cache_strings(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("core.cache.memory_backend.monotonic", lambda: now)
+    cache = MemoryCache(max_keys=2)
+
+    assert await cache.set("a", 1, ex=10)
+    assert await cache.set("a", 2, nx=True) is None
+    assert await cache.set("missing", 1, xx=True) is None
+    assert await cache.incr("a") == 2
+    assert await cache.mget(["a", "missing"]) == [b"2", None]
+    now += 10
+    assert await cache.get("a") is None
+
+    await cache.set("b", "b")
+    await cache.set("c", "c")
+    await cache.get("b")
+    await cache.set("d", "d")
+    # "c" was the least recently used
+    assert [key async for key in cache.scan_iter()] == ["b", "d"]
+
+
+async def test_memory_cache_sorted_sets_and_pipeline():
+    cache = MemoryCache()
+    async with cache.pipeline(transaction=True) as pipe:
+        pipe.zadd("feed", {"a": 1, "b": 3, "c": 2})
+        pipe.zremrangebyrank("feed", 0, -3)
+        pipe.zrevrange("feed", 0, -1)
+        pipe.hset("hash", "field", "value")
+        assert await pipe.execute() == [3, 1, [b"b", b"c"], 1]
+    assert await cache.hget("hash", "field") == b"value"
+    assert await cache.zrem("feed", "b", "c") == 2
+    assert not await cache.exists("feed")
+
+
+async def test_memory_cache_pubsub():
+    cache = MemoryCache()
+    async with cache.pubsub() as pubsub:
+        await pubsub.subscribe("channel")
+        assert await cache.publish("channel", b"message") == 1
+        message = await pubsub.get_message(ignore_subscribe_messages=True)
+        assert message["data"] == b"message"
+        assert await pubsub.get_message(timeout=0.01) is None
+    assert await cache.publish("channel", "message") == 0
+
+
+async def test_circuit_breaker_opens_and_probes(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("core.circuit_breaker.monotonic", lambda: now)
+    breaker = CircuitBreaker(
+        "test",
+        failure_threshold=2,
+        slow_call_seconds=0.1,
+        reset_timeout=5,
+    )
+
+    breaker.record_failure()
+    breaker.record_success(0.5)  # too slow, counts as a failure
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now += 5
+    breaker.before_call()
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # A probe cut short by its request lets the next call probe
+    breaker.record_abandoned()
+    breaker.before_call()
+    breaker.record_success(0.01)
+    breaker.before_call()
+
+
+async def test_posts_served_while_cache_is_down(client: AsyncClient, monkeypatch):
+    pipelines = []
+
+    def unavailable(*args, **kwargs):
+        pipelines.append(args)
+        raise CacheCircuitOpenError("Circuit redis is open")
+
+    monkeypatch.setattr(cache_client, "pipeline", unavailable)
+
+    response = await client.get("/api/v1/posts", params={"order": "title"})
+    assert response.status_code == 200
+    # The failed read only, no attempt to write the page back
+    assert len(pipelines) == 1
+
+
+async def test_cache_codec_round_trip():
+    page = orjson.dumps([{"id": 1, "content": "word " * 500}])
+
+    compressed = encode_value(page, min_size=1024)
+    assert compressed[:1] == ZLIB
+    assert len(compressed) < len(page)
+    assert decode_value(compressed) == page
+
+    small = b'[{"id":1}]'
+    assert encode_value(small, min_size=1024) == RAW + small
+    assert decode_value(RAW + small) == small
+    # Values cached before the format byte existed
+    assert decode_value(small) == small
+    with pytest.raises(CacheCodecError):
+        decode_value(b"\x7fgarbage")
+    with pytest.raises(CacheCodecError):
+        decode_value(ZLIB + b"garbage")
+
+
+def test_frequency_sketch_keeps_hot_keys():
+    sketch = FrequencySketch(width=64, depth=4, top=2, sample_size=1_000)
+    for _ in range(10):
+        sketch.add("hot")
+    for _ in range(5):
+        sketch.add("warm")
+    for key in range(20):
+        sketch.add(f"cold-{key}")
+
+    assert sketch.estimate("hot") >= 10
+    assert sketch.most_common() == ["hot", "warm"]
+
+    # Aging halves every count
+    for _ in range(1_000 - sketch.additions):
+        sketch.add("warm")
+    assert sketch.estimate("hot") < 10
+
+
+def test_window_keys_keep_filters_apart():
+    assert window_key(("a", "id", "b:title:x", 0)) != window_key(
+        ("a:id:b", "title", "x", 0)
+    )
+    assert window_key((None, "id", "b", 0)) != window_key(("b", "id", None, 0))
+
+
+async def test_stale_window_served_while_refreshed(
+    session, session_factory, query_budget
+):
+    cache = MemoryCache()
+    post_lists = PostListCache(
+        client=cache,
+        session_factory=session_factory,
+        window_size=10,
+        fresh_ex=60,
+        stale_ex=60,
+    )
+    params = dict(search=None, limit=10, offset=0, order="id", category=None)
+    page = await post_lists.get_page(session=session, **params)
+    key = window_key((None, "id", None, 0))
+    assert await cache.pttl(key) > 60_000
+
+    # Past its fresh TTL: served as is, reloaded in the background
+    await cache.expire(key, 30)
+    with query_budget(0):
+        assert await post_lists.get_page(session=session, **params) == page
+    await asyncio.gather(*post_lists._tasks)
+    assert await cache.pttl(key) > 60_000
+    assert (None, "id", None, 0) in post_lists.sketch.most_common()
+
+
+async def test_corrupt_window_is_a_miss(session):
+    cache = MemoryCache()
+    post_lists = PostListCache(client=cache, session_factory=None, window_size=10)
+    key = window_key((None, "id", None, 0))
+    await cache.set(key, ZLIB + b"garbage", ex=60)
+
+    page = await post_lists.get_page(
+        session=session, search=None, limit=10, offset=0, order="id", category=None
+    )
+    assert isinstance(orjson.loads(page), list)
+    assert decode_value(await cache.get(key)) != b"garbage"
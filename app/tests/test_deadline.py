@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import TimedRedis, cache_client
+from core.cache.redis_backend import run_command
+from core.circuit_breaker import CLOSED, CircuitBreaker
+from core.deadline import deadline, remaining
+from core.exceptions import GatewayTimeoutError
+from core.models.statement_timeout import QUERY_CANCELED
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_deadline_scope():
+    assert remaining() is None
+    with deadline(1.0):
+        assert 0 < remaining() <= 1.0
+    assert remaining() is None
+
+
+async def test_statement_cancelled_at_deadline(session: AsyncSession):
+    await session.commit()
+    with deadline(0.2):
+        with pytest.raises(DBAPIError) as error:
+            await session.execute(text("SELECT pg_sleep(5)"))
+    assert error.value.orig.pgcode == QUERY_CANCELED
+    await session.rollback()
+
+
+@pytest.mark.skipif(
+    not isinstance(cache_client, TimedRedis),
+    reason="Only Redis commands have timeouts",
+)
+async def test_redis_command_after_deadline():
+    with deadline(0.01):
+        await asyncio.sleep(0.02)
+        with pytest.raises(GatewayTimeoutError):
+            await cache_client.get("deadline")
+
+
+async def test_request_deadline_does_not_trip_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    with deadline(0.01):
+        with pytest.raises(GatewayTimeoutError):
+            await run_command(breaker, "GET", lambda: asyncio.sleep(1))
+    assert breaker.state == CLOSED
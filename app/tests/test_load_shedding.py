@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from core.exceptions import ServiceUnavailableError
+from core.load_shedding import ConcurrencyLimiter, limiters, shed_total
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_limiter_sheds_after_max_wait():
+    limiter = ConcurrencyLimiter("test", limit=1, max_wait_ms=20)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    with pytest.raises(ServiceUnavailableError) as error:
+        async with limiter.slot():
+            pass
+    assert error.value.status_code == 503
+    assert shed_total.values[("test", "timeout")] == 1
+
+    release.set()
+    await holder
+    async with limiter.slot():
+        pass
+
+
+async def test_limiter_sheds_on_expected_wait():
+    limiter = ConcurrencyLimiter("test_expected", limit=1, max_wait_ms=100)
+    limiter.service_time = 1.0
+    async with limiter.slot():
+        # One slot busy for a second on average: no point in queueing
+        with pytest.raises(ServiceUnavailableError):
+            async with limiter.slot():
+                pass
+    assert shed_total.values[("test_expected", "expected_wait")] == 1
+
+
+async def test_overloaded_route_returns_503(client: AsyncClient, monkeypatch):
+    monkeypatch.setitem(
+        limiters,
+        "db_read",
+        ConcurrencyLimiter("db_read", limit=1, max_wait_ms=10),
+    )
+    async with limiters["db_read"].slot():
+        response = await client.get("/api/v1/posts/1")
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
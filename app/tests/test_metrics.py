@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+
+import orjson
+import pytest
+from httpx import AsyncClient
+
+from core.metrics import merge_snapshots, read_snapshots, render_prometheus
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_metrics_endpoint(client: AsyncClient):
+    await client.get("/api/v1/posts")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/v1/posts"' in response.text
+    assert "db_pool_checked_out" in response.text
+    assert 'cache_requests_total{cache="posts_cache"' in response.text
+
+
+async def test_merge_snapshots_sums_workers():
+    snapshot = {
+        "latency": {
+            "type": "histogram",
+            "help": "Latency",
+            "labelnames": ["route"],
+            "buckets": [0.1, 1.0],
+            "values": [[["/posts"], {"counts": [1, 2, 0], "sum": 1.5, "count": 3}]],
+        },
+        "hits": {
+            "type": "counter",
+            "help": "Hits",
+            "labelnames": [],
+            "values": [[[], 2.0]],
+        },
+    }
+
+    text = render_prometheus(merge_snapshots([snapshot, snapshot]))
+
+    assert 'latency_bucket{route="/posts",le="0.1"} 2' in text
+    assert 'latency_bucket{route="/posts",le="1.0"} 6' in text
+    assert 'latency_bucket{route="/posts",le="+Inf"} 6' in text
+    assert 'latency_count{route="/posts"} 6' in text
+    assert "hits 4.0" in text
+
+
+async def test_dead_worker_snapshots_are_folded(tmp_path):
+    def write(name: str, hits: float) -> Path:
+        path = tmp_path / name
+        snapshot = {
+            "hits": {
+                "type": "counter",
+                "help": "Hits",
+                "labelnames": [],
+                "values": [[[], hits]],
+            },
+            "in_flight": {
+                "type": "gauge",
+                "help": "In flight",
+                "labelnames": [],
+                "values": [[[], 1.0]],
+            },
+        }
+        path.write_bytes(orjson.dumps(snapshot))
+        return path
+
+    # Pids above the kernel's pid_max never exist
+    write("999999999-a.json", 2.0)
+    # A live pid whose file is no longer written was reused
+    reused = write(f"{os.getpid()}-b.json", 3.0)
+    os.utime(reused, (0, 0))
+    live = write(f"{os.getpid()}-c.json", 1.0)
+
+    merged = merge_snapshots(read_snapshots(str(tmp_path), stale_after=60))
+
+    assert merged["hits"]["values"] == {(): 6.0}
+    assert merged["in_flight"]["values"] == {(): 1.0}
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == [
+        live.name,
+        "dead.json",
+    ]
+    write("999999998-d.json", 4.0)
+    merged = merge_snapshots(read_snapshots(str(tmp_path), stale_after=60))
+    assert merged["hits"]["values"] == {(): 10.0}
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from core.exceptions import ServiceUnavailableError
+from core.schemas.post import PostCreate
+from crud.post_write_batcher import PostWriteBatcher
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_isolates_failing_posts(test_user, session_factory):
+    batcher = PostWriteBatcher(session_factory, max_batch_size=10, max_delay_ms=50)
+    batcher.start()
+    titles = ["Первый", "x" * 101, "Третий"]
+
+    results = await asyncio.gather(
+        *(
+            batcher.create_post(
+                PostCreate(title=title, content="", category="Пакет"),
+                user_id=test_user.id,
+            )
+            for title in titles
+        ),
+        return_exceptions=True,
+    )
+    await batcher.stop()
+
+    assert results[0].title == "Первый"
+    assert isinstance(results[1], DBAPIError)
+    assert results[2].title == "Третий"
+    assert results[2].id > results[0].id
+    assert results[0].user == test_user.email
+
+
+async def test_posts_refused_once_batching_stops():
+    batcher = PostWriteBatcher(None, max_batch_size=10, max_delay_ms=1)
+    post = PostCreate(title="Пост", content="", category="Пакет")
+
+    async def broken(batch):
+        raise RuntimeError("Batcher bug")
+
+    batcher._write = broken
+    batcher.start()
+    # Queued when the task dies: failed instead of left waiting
+    with pytest.raises(ServiceUnavailableError):
+        await batcher.create_post(post, user_id=1)
+    with pytest.raises(ServiceUnavailableError):
+        await batcher.create_post(post, user_id=1)
+    await batcher.stop()
+
+    batcher.start()
+    await batcher.stop()
+    with pytest.raises(ServiceUnavailableError):
+        await batcher.create_post(post, user_id=1)
@@ -1,5 +1,26 @@
+from datetime import datetime
+
+import orjson
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select, text
+
+from api.api_v1 import posts as posts_api
+from core.cache import (
+    CacheCircuitOpenError,
+    MemoryCache,
+    author_posts_key,
+    author_posts_version_key,
+    cache_client,
+)
+from core.cache.codec import encode_value
+from core.config import settings
+from core.latest_posts import LatestPosts, latest_posts, post_key, READY_KEY
+from core.models import Category, Post, User
+from core.models.pool_metrics import checkouts
+from core.schemas.post import PostRead
+from crud.posts import get_or_create_category, select_posts
+from crud.view_counter import ViewCounter
 
 pytestmark = pytest.mark.anyio
 
@@ -71,3 +92,297 @@ async def test_delete_post(client: AsyncClient, post_data):
 
     response = await client.get(f"/api/v1/posts/{post_id}")
     assert response.status_code == 404
+
+
+async def test_get_post_query_budget(client: AsyncClient, post_data, query_budget):
+    response = await client.post("/api/v1/posts", json=post_data)
+    post_id = response.json()["id"]
+
+    with query_budget(3):
+        response = await client.get(f"/api/v1/posts/{post_id}")
+    assert response.status_code == 200
+    assert "db;dur=" in response.headers["server-timing"]
+
+
+async def test_cached_posts_skip_database(client: AsyncClient, query_budget):
+    params = {"limit": 7, "order": "title"}
+    response = await client.get("/api/v1/posts", params=params)
+    assert response.status_code == 200
+
+    checkouts_before = checkouts.values.get((), 0)
+    with query_budget(0):
+        response = await client.get("/api/v1/posts", params=params)
+    assert response.status_code == 200
+    assert checkouts.values.get((), 0) == checkouts_before
+
+
+async def test_change_foreign_post_forbidden(client: AsyncClient, session):
+    other_user = User(
+        email="other@example.com",
+        hashed_password="not-used",
+        is_active=True,
+        is_verified=True,
+        is_superuser=False,
+    )
+    category = await get_or_create_category(session=session, category_name="Чужое")
+    session.add(other_user)
+    await session.flush()
+    post = Post(title="Чужой пост", category_id=category.id, user_id=other_user.id)
+    session.add(post)
+    await session.commit()
+
+    response = await client.patch(f"/api/v1/posts/{post.id}", json={"title": "x"})
+    assert response.status_code == 403
+
+    response = await client.patch(
+        f"/api/v1/posts/{post.id}", json={"category": "Не создана"}
+    )
+    assert response.status_code == 403
+    result = await session.execute(
+        select(Category.id).where(Category.name == "Не создана")
+    )
+    assert result.scalar_one_or_none() is None
+
+    response = await client.delete(f"/api/v1/posts/{post.id}")
+    assert response.status_code == 403
+
+
+async def test_post_changes(client: AsyncClient, post_data, monkeypatch):
+    monkeypatch.setattr(settings.sync, "settle_seconds", 0)
+    response = await client.get("/api/v1/posts/changes", params={"limit": 500})
+    assert response.status_code == 200
+    cursor = response.json()["cursor"]
+
+    created = (await client.post("/api/v1/posts", json=post_data)).json()
+    removed = (await client.post("/api/v1/posts", json=post_data)).json()
+    await client.delete(f"/api/v1/posts/{removed['id']}")
+
+    response = await client.get("/api/v1/posts/changes", params={"since": cursor})
+    assert response.status_code == 200
+    changes = response.json()
+    assert [post["id"] for post in changes["posts"]] == [created["id"]]
+    assert changes["deleted"] == [removed["id"]]
+    assert changes["has_more"] is False
+
+    response = await client.get(
+        "/api/v1/posts/changes", params={"since": changes["cursor"]}
+    )
+    assert response.json()["posts"] == []
+    assert response.json()["deleted"] == []
+
+    response = await client.get("/api/v1/posts/changes", params={"since": "bogus"})
+    assert response.status_code == 400
+
+
+def plan_nodes(plan: dict):
+    yield plan["Node Type"]
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+@pytest.mark.parametrize("order", ["id", "title", "created_at", "views"])
+async def test_posts_ordering_uses_index(session, order):
+    statement = select_posts(limit=10, offset=20, order=order).compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    # The test table is tiny, make the planner show what it would do at scale
+    await session.execute(text("SET LOCAL enable_seqscan = off"))
+    result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {statement}"))
+    plan = result.scalar_one()
+    [explain] = orjson.loads(plan) if isinstance(plan, str) else plan
+    nodes = list(plan_nodes(explain["Plan"]))
+
+    assert "Sort" not in nodes
+    assert {"Index Scan", "Index Only Scan"} & set(nodes)
+
+
+async def test_user_posts_pages_and_invalidation(
+    client: AsyncClient, post_data, test_user
+):
+    ids = []
+    for _ in range(3):
+        response = await client.post("/api/v1/posts", json=post_data)
+        ids.append(response.json()["id"])
+
+    response = await client.get("/api/v1/users/me/posts", params={"limit": 2})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [post["id"] for post in first_page["posts"]] == ids[:0:-1]
+
+    response = await client.get(
+        f"/api/v1/users/{test_user.id}/posts",
+        params={"limit": 2, "cursor": first_page["next_cursor"]},
+    )
+    assert ids[0] in [post["id"] for post in response.json()["posts"]]
+
+    # Cached now; a write by the author must drop the cached pages
+    await client.delete(f"/api/v1/posts/{ids[-1]}")
+    response = await client.get("/api/v1/users/me/posts", params={"limit": 2})
+    assert ids[-1] not in [post["id"] for post in response.json()["posts"]]
+
+    response = await client.get("/api/v1/users/999999/posts")
+    assert response.status_code == 404
+
+
+async def test_user_posts_ignore_fills_older_than_a_write(
+    client: AsyncClient, post_data, test_user
+):
+    version = await cache_client.get(author_posts_version_key(test_user.id))
+    response = await client.post("/api/v1/posts", json=post_data)
+    post_id = response.json()["id"]
+
+    # A reader that queried before the write stores its page after it
+    stale_page = encode_value(b'{"posts":[],"next_cursor":null}')
+    await cache_client.hset(
+        author_posts_key(test_user.id),
+        "None:10",
+        (version or b"0") + b"\n" + stale_page,
+    )
+    response = await client.get("/api/v1/users/me/posts", params={"limit": 10})
+    assert post_id in [post["id"] for post in response.json()["posts"]]
+
+
+async def test_latest_posts_served_from_redis(
+    client: AsyncClient, post_data, query_budget
+):
+    await latest_posts.replace([], {})
+    ids = []
+    for _ in range(2):
+        response = await client.post("/api/v1/posts", json=post_data)
+        ids.append(response.json()["id"])
+
+    params = {"order": "created_at", "limit": 2}
+    with query_budget(0):
+        response = await client.get("/api/v1/posts", params=params)
+    assert [post["id"] for post in response.json()] == ids[::-1]
+
+    params["category"] = post_data["category"]
+    with query_budget(0):
+        response = await client.get("/api/v1/posts", params=params)
+    assert [post["id"] for post in response.json()] == ids[::-1]
+
+    # The feed is one post short now, so the page comes from the database
+    await client.delete(f"/api/v1/posts/{ids[-1]}")
+    response = await client.get("/api/v1/posts", params=params)
+    assert response.json()[0]["id"] == ids[0]
+    await cache_client.delete(READY_KEY)
+
+
+async def test_latest_posts_gap_marks_feed_for_rebuild(post_data):
+    feed = LatestPosts(MemoryCache(), size=10, post_ttl=60)
+    now = datetime.now()
+    posts = [
+        PostRead(
+            id=post_id,
+            **post_data,
+            user="author@example.com",
+            created_at=now,
+            updated_at=now,
+        )
+        for post_id in (1, 2)
+    ]
+    await feed.replace(posts, {})
+    assert 0 < await feed.client.pttl(READY_KEY) <= 60_000
+    assert await feed.get_page(limit=2) is not None
+
+    # Post keys expire one by one
+    await feed.client.delete(post_key(1))
+    assert await feed.get_page(limit=2) is None
+    assert feed.rebuild_needed.is_set()
+    assert not await feed.is_ready()
+
+
+async def test_writes_succeed_while_cache_is_down(
+    client: AsyncClient, post_data, monkeypatch
+):
+    async def unavailable(*args, **kwargs):
+        raise CacheCircuitOpenError("Circuit is open")
+
+    monkeypatch.setattr(posts_api, "invalidate_author_posts", unavailable)
+    monkeypatch.setattr(posts_api, "publish_suggest_changes", unavailable)
+    monkeypatch.setattr(latest_posts, "add", unavailable)
+    await cache_client.set(READY_KEY, 1)
+
+    # Committed, so a retry by the client would create it twice
+    response = await client.post("/api/v1/posts", json=post_data)
+    assert response.status_code == 201
+    assert latest_posts.dirty
+
+    await latest_posts.drop_if_dirty()
+    assert not latest_posts.dirty
+    assert not await latest_posts.is_ready()
+
+
+async def test_views_are_flushed_in_batches(
+    client: AsyncClient, post_data, session, session_factory
+):
+    response = await client.post("/api/v1/posts", json=post_data)
+    post_id = response.json()["id"]
+
+    counter = ViewCounter(session_factory=session_factory)
+    counter.record(post_id)
+    counter.record(post_id)
+    await counter.flush()
+
+    post = await session.get(Post, post_id, populate_existing=True)
+    assert post.view_count == 2
+    assert post.updated_at == post.created_at
+
+
+async def test_view_counter_caps_views_while_flushes_fail():
+    def unavailable():
+        raise OSError("Database is down")
+
+    counter = ViewCounter(session_factory=unavailable, max_pending=1, max_tracked=2)
+    for post_id in (1, 2, 3):
+        counter.record(post_id)
+    counter._full.clear()
+
+    assert not await counter.flush()
+    # Kept for the next flush, without triggering one before the backoff
+    counter.record(1)
+    assert counter._pending == {1: 2, 2: 1}
+    assert not counter._full.is_set()
+
+
+@pytest.mark.parametrize("search", ["  ", " a ", "a"])
+async def test_short_search_rejected_after_normalizing(client: AsyncClient, search):
+    response = await client.get("/api/v1/posts", params={"search": search})
+    assert response.status_code == 422
+
+
+async def test_failed_flush_merges_back_within_max_tracked():
+    counter = ViewCounter(session_factory=None, max_pending=10, max_tracked=2)
+    counter.record(1)
+
+    def unavailable():
+        # Recorded while the flush was running
+        counter.record(2)
+        counter.record(3)
+        raise OSError("Database is down")
+
+    counter.session_factory = unavailable
+    assert not await counter.flush()
+    assert counter._pending == {2: 1, 3: 1}
+
+
+async def test_overlapping_pages_share_cached_windows(
+    client: AsyncClient, post_data, query_budget
+):
+    post_data["title"] = "Window Search Post"
+    for _ in range(3):
+        await client.post("/api/v1/posts", json=post_data)
+
+    params = {"search": "window search", "order": "title", "limit": 2}
+    response = await client.get("/api/v1/posts", params=params)
+    first_page = response.json()
+    assert len(first_page) == 2
+
+    # Same window: other limit/offset, other case and spacing
+    with query_budget(0):
+        response = await client.get(
+            "/api/v1/posts",
+            params={**params, "search": "  WINDOW   search", "offset": 1},
+        )
+    assert response.json()[0] == first_page[1]
@@ -0,0 +1,65 @@
+import pytest
+from httpx import AsyncClient
+
+from core.cache import cache_client
+from core.config import settings, RateLimitRule
+from core.rate_limit import LocalTokenBuckets
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_local_buckets_refill(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("core.rate_limit.monotonic", lambda: now)
+    buckets = LocalTokenBuckets(max_keys=1)
+    rule = RateLimitRule(capacity=2, refill_per_second=0.5)
+
+    assert buckets.take("a", rule) is None
+    assert buckets.take("a", rule) is None
+    assert buckets.take("a", rule) == pytest.approx(2.0)
+    now += 2
+    assert buckets.take("a", rule) is None
+
+    buckets.take("b", rule)
+    assert list(buckets.buckets) == ["b"]
+
+
+async def test_search_rate_limited(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings.rate_limit, "enabled", True)
+    monkeypatch.setitem(
+        settings.rate_limit.rules,
+        "posts_search",
+        RateLimitRule(capacity=1, refill_per_second=0.01),
+    )
+    await cache_client.delete("rate_limit:posts_search:ip:127.0.0.1")
+
+    response = await client.get("/api/v1/posts", params={"search": "limit"})
+    assert response.status_code == 200
+    response = await client.get("/api/v1/posts", params={"search": "limit"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    # Listing without a search term is not limited by this rule
+    response = await client.get("/api/v1/posts")
+    assert response.status_code == 200
+
+
+async def test_new_tokens_do_not_get_new_buckets(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings.rate_limit, "enabled", True)
+    monkeypatch.setitem(
+        settings.rate_limit.rules,
+        "posts_write",
+        RateLimitRule(capacity=1, refill_per_second=0.01),
+    )
+    await cache_client.delete("rate_limit:posts_write:ip:127.0.0.1")
+    post = {"title": "Limited", "category": "Limits"}
+
+    # Tokens that do not validate are charged to the client IP
+    response = await client.post(
+        "/api/v1/posts", json=post, headers={"Authorization": "Bearer first"}
+    )
+    assert response.status_code == 201
+    response = await client.post(
+        "/api/v1/posts", json=post, headers={"Authorization": "Bearer second"}
+    )
+    assert response.status_code == 429
@@ -0,0 +1,102 @@
+import asyncio
+from contextlib import suppress
+
+import pytest
+from httpx import AsyncClient
+
+from core.cache import MemoryCache
+from core.config import settings
+from core.suggest import (
+    SuggestIndex,
+    keep_index_current,
+    publish_suggest_changes,
+    suggest_index,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_suggest_index_counts_posts():
+    index = SuggestIndex(max_entries=3)
+    index.load([("Hello  World", "title", 2), ("help", "category", 1)])
+
+    assert index.suggest("HEL") == [
+        {"text": "Hello  World", "kind": "title"},
+        {"text": "help", "kind": "category"},
+    ]
+    index.remove("hello world", "title")
+    assert len(index.suggest("hello")) == 1
+    index.remove("hello world", "title")
+    assert index.suggest("hello") == []
+
+    index.apply('{"add": [["Heap", "title"], ["Hex", "title"], ["Hey", "title"]]}')
+    # The third entry would go over max_entries
+    assert [s["text"] for s in index.suggest("he", limit=5)] == ["Heap", "help", "Hex"]
+
+
+async def test_suggest_ranks_by_posts():
+    index = SuggestIndex()
+    index.load([("Alpha", "title", 1), ("Alpine", "title", 5), ("Alps", "category", 3)])
+
+    assert [s["text"] for s in index.suggest("alp", limit=2)] == ["Alpine", "Alps"]
+    assert [s["text"] for s in index.suggest("alpha")] == ["Alpha"]
+    assert index.suggest("alq") == []
+
+    # Short prefixes are served from their ranked keys, kept in step
+    assert [s["text"] for s in index.suggest(" A", limit=3)] == [
+        "Alpine",
+        "Alps",
+        "Alpha",
+    ]
+    index.remove("alpine", "title")
+    index.add("Alpha", "title", count=4)
+    assert [s["text"] for s in index.suggest("al", limit=2)] == ["Alpha", "Alpine"]
+    for _ in range(4):
+        index.remove("alpine", "title")
+    assert [s["text"] for s in index.suggest("a")] == ["Alpha", "Alps"]
+
+
+async def test_suggest_endpoint(client: AsyncClient):
+    suggest_index.load([("FastAPI tips", "title", 1), ("Fashion", "category", 3)])
+
+    response = await client.get("/api/v1/posts/suggest", params={"prefix": "fas"})
+    assert response.status_code == 200
+    assert [s["text"] for s in response.json()] == ["Fashion", "FastAPI tips"]
+
+    response = await client.get(
+        "/api/v1/posts/suggest", params={"prefix": "fast", "limit": 1}
+    )
+    assert response.json() == [{"text": "FastAPI tips", "kind": "title"}]
+
+
+async def test_index_skips_loaded_changes_and_reloads_after_resubscribe():
+    cache = MemoryCache()
+    index = SuggestIndex()
+    loads = []
+
+    async def load_terms():
+        loads.append(len(loads))
+        return [("Alpha", "title", 1)]
+
+    # Committed before the load, which already has it
+    await publish_suggest_changes(cache, add=[("Alpha", "title")])
+    keeper = asyncio.create_task(keep_index_current(cache, index, load_terms))
+    await asyncio.sleep(0.05)
+    assert index.loaded_version == 1
+    index.apply('{"version": 1, "add": [["Alpha", "title"]]}')
+    assert index.entries[("alpha", "title")][1] == 1
+
+    await publish_suggest_changes(cache, add=[("Beta", "title")])
+    await asyncio.sleep(0.05)
+    assert [s["text"] for s in index.suggest("be")] == ["Beta"]
+
+    # Subscribed again after a reconnect: what was published meanwhile is lost
+    [pubsub] = cache.subscribers[settings.suggest.channel]
+    pubsub.messages.put_nowait({"type": "subscribe", "data": 1})
+    await asyncio.sleep(0.05)
+    assert len(loads) == 2
+    assert index.suggest("be") == []
+
+    keeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await keeper
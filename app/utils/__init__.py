@@ -1,5 +1,8 @@
 __all__ = [
     "camel_case_to_snake_case",
+    "encode_cursor",
+    "decode_cursor",
 ]
 
-from .case_converter import camel_case_to_snake_case
\ No newline at end of file
+from .case_converter import camel_case_to_snake_case
+from .cursor import encode_cursor, decode_cursor
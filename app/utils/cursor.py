@@ -0,0 +1,25 @@
+import base64
+from typing import Any
+
+import orjson
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """
+    Opaque, URL-safe pagination cursor. Datetimes are stored as ISO strings.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """
+    Raises ValueError when the cursor was not produced by `encode_cursor`.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, orjson.JSONDecodeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(values, dict):
+        raise ValueError("Malformed cursor")
+    return values